@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+""" Seed a large TestResult table in a test database and time the queries data_tests runs most often, with EXPLAIN
+output, before and after the indexes added by migration 0008_testresult_indexes.
+
+    python benchmarks/result_indexes.py --rows 1000000 --output results.json
+
+Uses the settings in DJANGO_SETTINGS_MODULE (tests.settings by default, an in-memory sqlite database). Point it at
+settings for a PostgreSQL or MySQL database to benchmark those; only the test database is written to. """
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # NOQA
+from django.core.management import call_command  # NOQA
+from django.db import connection  # NOQA
+from django.db.migrations.loader import MigrationLoader  # NOQA
+from django.db.models import Count, Q  # NOQA
+from django.test.utils import setup_databases, teardown_databases  # NOQA
+
+BEFORE_MIGRATION = '0007_not_run'
+AFTER_MIGRATION = '0008_testresult_indexes'
+BATCH_SIZE = 10000
+# Queries that are timed with count() rather than fetching every row, as the admin does for its filters
+COUNTED = ('failing results (admin filter)', 'stale results')
+
+
+def historical_models():
+    """ ContentType, TestMethod and TestResult as they are at BEFORE_MIGRATION. The indexes are all that
+    AFTER_MIGRATION adds, so these models match the table both before and after it, whatever later migrations add """
+    state = MigrationLoader(connection).project_state(('data_tests', BEFORE_MIGRATION))
+    return [state.apps.get_model(*model) for model in (
+        ('contenttypes', 'ContentType'), ('data_tests', 'TestMethod'), ('data_tests', 'TestResult'))]
+
+
+def seed(rows, test_methods):
+    ContentType, TestMethod, TestResult = historical_models()
+
+    content_types = list(ContentType.objects.all())
+    methods = [TestMethod.objects.create(title='Test {}'.format(i), method_name='test_{}'.format(i),
+                                         is_class_method=False, content_type=content_types[i % len(content_types)])
+               for i in range(test_methods)]
+    per_method = rows // test_methods
+    batch = []
+    for test_method in methods:
+        for object_id in range(1, per_method + 1):
+            passed = random.random() < 0.9
+            batch.append(TestResult(
+                test_method=test_method, content_type_id=test_method.content_type_id,
+                # A few results of deleted objects, as left behind for delete_stale_results
+                object_id=None if random.random() < 0.001 else object_id,
+                passed=passed, xfail=not passed and random.random() < 0.1, message='' if passed else 'failed'))
+            if len(batch) == BATCH_SIZE:
+                TestResult.objects.bulk_create(batch)
+                batch = []
+    TestResult.objects.bulk_create(batch)
+    return methods
+
+
+def queries(test_method):
+    TestResult = historical_models()[2]
+
+    results = TestResult.objects.all()
+    object_id = random.randint(1, 1000)
+    return {
+        'results of an object': results.filter(content_type_id=test_method.content_type_id, object_id=object_id),
+        'failing results (admin filter)': results.filter(test_method_id=test_method.pk, passed=False, xfail=False),
+        'passed/failed counts of a run': results.filter(test_method_id=test_method.pk).values('test_method').annotate(
+            passed_count=Count('pk', filter=Q(passed=True)), failed_count=Count('pk', filter=Q(passed=False))),
+        'stale results': results.filter(test_method_id=test_method.pk, object_id__isnull=True),
+    }
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE' if connection.vendor == 'sqlite' else 'ANALYZE data_tests_testresult')
+
+
+def measure(test_method, repeat):
+    measured = {}
+    for name, queryset in queries(test_method).items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            queryset.count() if name in COUNTED else list(queryset.all())
+            timings.append(time.perf_counter() - start)
+        measured[name] = {'median_ms': statistics.median(timings) * 1000, 'explain': queryset.explain()}
+    return measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=200000, help='Number of test results to seed')
+    parser.add_argument('--test-methods', type=int, default=20, help='Number of test methods to spread them over')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of times each query is timed')
+    parser.add_argument('--output', help='Write the timings and query plans to this file as JSON')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    django.setup()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        call_command('migrate', 'data_tests', BEFORE_MIGRATION, verbosity=0)
+        start = time.perf_counter()
+        test_method = seed(args.rows, args.test_methods)[0]
+        print('Seeded {} results in {:.1f}s on {}'.format(args.rows, time.perf_counter() - start, connection.vendor))
+        analyze()
+        before = measure(test_method, args.repeat)
+        call_command('migrate', 'data_tests', AFTER_MIGRATION, verbosity=0)
+        analyze()
+        after = measure(test_method, args.repeat)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    for name in before:
+        print('\n{}: {:.2f}ms -> {:.2f}ms'.format(name, before[name]['median_ms'], after[name]['median_ms']))
+        print('  before: {}'.format(before[name]['explain'].replace('\n', '\n          ')))
+        print('  after:  {}'.format(after[name]['explain'].replace('\n', '\n          ')))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'vendor': connection.vendor, 'rows': args.rows, 'before': before, 'after': after}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,16 @@
 from django.contrib import admin, messages
+from django.contrib.admin.utils import unquote
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.contenttypes.admin import GenericTabularInline
 from django.contrib.contenttypes.forms import BaseGenericInlineFormSet
+from django.core.exceptions import ObjectDoesNotExist
 from django.urls import NoReverseMatch
 from django.utils.safestring import mark_safe
 
-from data_tests.models import TestResult
+from data_tests.deferred import DeferredTests, has_pending_tests
+from data_tests.models import TestMethodRun, TestMethodSummary, TestResult, TestRun
+
+TESTS_PENDING_MESSAGE = 'Data tests pending, results will be shown once they have run'
 
 
 @admin.register(TestResult)
@@ -13,6 +19,7 @@ class TestResultAdmin(admin.ModelAdmin):
     list_filter = ('passed', 'xfail', 'test_method', ('content_type', admin.RelatedOnlyFieldListFilter))
     list_editable = ('xfail', 'justification')
     list_per_page = 20
+    list_select_related = ('test_method',)
     readonly_fields = ['test_method', 'details', 'object_link', 'passed']
     fields = readonly_fields + ['xfail', 'justification']
 
@@ -21,19 +28,88 @@ class TestResultAdmin(admin.ModelAdmin):
 
     details.allow_tags = True
 
+    def get_changelist(self, request, **kwargs):
+        return TestResultChangeList
+
     def object_link(self, obj):
         try:
             link_name = str(obj.get_object())
             return mark_safe(obj.object_admin_hyperlink(link_name))
         except NoReverseMatch:
             return 'No admin page implemented'
+        except ObjectDoesNotExist:
+            return 'Object no longer exists'
     object_link.allow_tags = True
 
 
+class TestResultChangeList(ChangeList):
+    """ Loads the tested objects of a page of results with one query per content type, rather than a query per row """
+
+    def get_results(self, request):
+        super(TestResultChangeList, self).get_results(request)
+        # Prefetch into the queryset's own result cache, as list_editable builds its formset from the queryset
+        TestResult.prefetch_objects(self.result_list)
+
+
+class TestMethodRunInline(admin.TabularInline):
+    model = TestMethodRun
+    extra = 0
+    can_delete = False
+    fields = ('test_method', 'duration', 'objects_tested', 'results_updated', 'passed', 'failed', 'xfail',
+              'not_run', 'skipped', 'newly_failing', 'newly_passing', 'error')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TestRun)
+class TestRunAdmin(admin.ModelAdmin):
+    list_display = ('started', 'finished', 'duration')
+    readonly_fields = ('started', 'finished', 'duration')
+    inlines = [TestMethodRunInline]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(TestMethodSummary)
+class TestMethodSummaryAdmin(admin.ModelAdmin):
+    list_display = ('test_method', 'passed', 'failed', 'xfail', 'not_run', 'modified')
+    list_select_related = ('test_method',)
+    ordering = ('-failed',)
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 class DataTestsAdminMixin(object):
+    # How tests are run when an object is saved: 'sync' runs them within the request, 'thread' runs them in a
+    # background thread pool once the save has committed and 'queue' leaves them to rundatatests --drain-queue
+    data_tests_mode = 'sync'
+    # In 'thread' mode, wait up to this many milliseconds for the tests so that quick ones are still reported inline
+    data_tests_latency_budget = None
+    actions = ['rerun_data_tests']
+
+    def rerun_data_tests(self, request, queryset):
+        # Class method tests are evaluated once for all the selected objects
+        TestResult.rerun_tests_for_objects(queryset)
+        self.message_user(request, 'Re-ran data tests for {} objects'.format(len(queryset)))
+    rerun_data_tests.short_description = 'Re-run data tests for the selected objects'
+
     def run_tests(self, request, obj):
-        TestResult.rerun_tests_for_object(obj)
-        obj.refresh_from_db()
+        if self.data_tests_mode == 'sync':
+            TestResult.rerun_tests_for_object(obj)
+            obj.refresh_from_db()
+            self.report_failing_tests(request, obj)
+        else:
+            request._data_tests_deferred = DeferredTests(obj, self.data_tests_mode)
+
+    def report_failing_tests(self, request, obj):
         test_results = TestResult.test_results_for_object(obj)
         failing = test_results.filter(passed=False, xfail=False)
         if failing.exists():
@@ -42,6 +118,21 @@ class DataTestsAdminMixin(object):
                               mark_safe("Object saved successfully the following tests are failing: <br>%s" % report),
                               messages.WARNING)
 
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        response = super(DataTestsAdminMixin, self).changeform_view(request, object_id, form_url, extra_context)
+        # Deferred tests are only submitted once changeform_view's transaction has committed
+        deferred = getattr(request, '_data_tests_deferred', None)
+        if deferred is not None:
+            if deferred.wait(self.data_tests_latency_budget):
+                self.report_failing_tests(request, deferred.obj)
+            else:
+                self.message_user(request, TESTS_PENDING_MESSAGE, messages.INFO)
+        elif object_id and request.method == 'GET' and self.data_tests_mode != 'sync':
+            obj = self.get_object(request, unquote(object_id))
+            if obj is not None and has_pending_tests(obj, self.data_tests_mode):
+                self.message_user(request, TESTS_PENDING_MESSAGE, messages.INFO)
+        return response
+
     def response_add(self, request, obj, post_url_continue=None):
         self.run_tests(request, obj)
         return super(DataTestsAdminMixin, self).response_add(request, obj, post_url_continue)
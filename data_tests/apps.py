@@ -11,5 +11,11 @@ class DataTestsConfig(AppConfig):
     verbose_name = 'Data tests'
 
     def ready(self):
+        from data_tests.resolver import clear_caches
+        # Not limited to this app, as any app's migrations can create or delete content types
+        post_migrate.connect(clear_caches, dispatch_uid='data_tests_clear_caches')
         post_migrate.connect(post_migration_callback, sender=self)
 
+        from data_tests.signals import connect_dirty_object_handlers
+        connect_dirty_object_handlers()
+
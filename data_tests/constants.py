@@ -1 +1,43 @@
 MAX_MESSAGE_LENGTH = 500
+
+# Start of the message of a test result whose test raised, rather than returning a result
+TEST_ERROR_PREFIX = 'Test failed to run correctly!'
+
+# Number of test results processed per query when running instance tests
+DEFAULT_CHUNK_SIZE = 1000
+
+# Database backends that support creating missing test results with a single INSERT ... SELECT anti-join
+ANTI_JOIN_VENDORS = ('postgresql', 'mysql', 'sqlite')
+
+# Maximum number of newly failing/passing object ids kept per test method in a run report
+MAX_REPORTED_OBJECTS = 1000
+
+# Upper bound of the random tokens used to claim rows of the dirty object queue
+MAX_CLAIM = 2 ** 31 - 1
+# Seconds after which a claim on the dirty object queue is taken to belong to a drain that died, and is claimed again
+DEFAULT_CLAIM_TIMEOUT = 3600
+
+# Number of threads running tests for objects saved in the admin, when DataTestsAdminMixin.data_tests_mode = 'thread'
+DEFAULT_THREAD_POOL_SIZE = 2
+
+# Number of slowest objects listed per test method when profiling
+PROFILE_SLOWEST_OBJECTS = 10
+
+# Messages of test results that were not run because their test method ran out of time, see registry.test_method
+NOT_RUN_BUDGET_EXCEEDED = 'not run (budget exceeded)'
+NOT_RUN_TIMED_OUT = 'not run (timed out after {:g}s)'
+
+# Maximum number of entries in each of the resolver's caches of content types, model classes and test callables
+RESOLVER_CACHE_SIZE = 1024
+
+# Default and maximum number of results per page of the JSON results API
+API_PAGE_SIZE = 100
+MAX_API_PAGE_SIZE = 1000
+
+# Number of recent runs of a test method averaged to estimate its cost when scheduling, see rundatatests --plan
+SCHEDULE_HISTORY_RUNS = 5
+# Estimated seconds per object of a test method that has never run
+DEFAULT_OBJECT_COST = 0.001
+
+# Bytes of the hashes stored in TestResult.fingerprint (twice as many hex characters), see registry.test_method
+FINGERPRINT_SIZE = 8
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from data_tests import resolver
+from data_tests.constants import DEFAULT_THREAD_POOL_SIZE
+from data_tests.models import DirtyObject, TestResult
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# (content type id, object id) of objects whose tests are queued or running in this process's thread pool
+_pending = set()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'DATA_TESTS_THREAD_POOL_SIZE', DEFAULT_THREAD_POOL_SIZE),
+                thread_name_prefix='data_tests')
+    return _executor
+
+
+def _key(obj):
+    return resolver.content_type_for_model(type(obj)).pk, obj.pk
+
+
+def _rerun_tests(model, pk, key):
+    try:
+        obj = model._base_manager.filter(pk=pk).first()
+        if obj is not None:
+            TestResult.rerun_tests_for_object(obj)
+    except Exception:
+        # Nothing waits on most of these futures, so log rather than let the exception disappear with them
+        logger.exception('Error running deferred data tests for {} {}'.format(model._meta.label, pk))
+    finally:
+        _pending.discard(key)
+        # Connections opened by this worker thread are not cleaned up by the request cycle
+        connections.close_all()
+
+
+class DeferredTests(object):
+    """ Tests for obj that will run once the transaction that saved it commits """
+
+    def __init__(self, obj, mode):
+        self.obj = obj
+        self.mode = mode
+        self.future = None
+        transaction.on_commit(self._submit, using=router.db_for_write(type(obj)))
+
+    def _submit(self):
+        key = _key(self.obj)
+        if self.mode == 'queue':
+            DirtyObject.enqueue(key[0], [key[1]])
+        else:
+            _pending.add(key)
+            self.future = get_executor().submit(_rerun_tests, type(self.obj), self.obj.pk, key)
+
+    def wait(self, timeout_ms):
+        """ wait up to timeout_ms for the tests to finish, returning whether they have """
+        if self.future is None or not timeout_ms:
+            return False
+        try:
+            self.future.result(timeout=timeout_ms / 1000.0)
+        except TimeoutError:
+            return False
+        return True
+
+
+def has_pending_tests(obj, mode):
+    """ whether tests for obj are waiting in this process's thread pool ('thread' mode) or in the DirtyObject
+    queue ('queue' mode) """
+    content_type_id, object_id = _key(obj)
+    if mode == 'queue':
+        return DirtyObject.objects.filter(content_type_id=content_type_id, object_id=object_id).exists()
+    return (content_type_id, object_id) in _pending
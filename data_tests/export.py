@@ -0,0 +1,78 @@
+""" Streaming export of failing test results, shared by the exportdatatestresults command and TestResultExportView.
+Results are read with a server-side cursor (where the database supports one) a chunk at a time, so memory use
+doesn't grow with the number of results exported """
+from collections import defaultdict
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from data_tests import resolver
+from data_tests.models import TestResult, db_for_read, get_chunk_size
+
+FIELDS = ('id', 'test_method_id', 'test_method__title', 'content_type_id', 'object_id', 'xfail', 'message',
+          'justification', 'modified')
+# Column names of FIELDS in the export
+COLUMNS = ('id', 'test_method_id', 'test', 'content_type_id', 'object_id', 'xfail', 'message', 'justification',
+           'modified')
+FORMATS = ('csv', 'jsonl')
+
+
+def failing_results(test_methods=None, content_type_id=None, include_xfail=False):
+    """ failing results, in id order, of test_methods (a TestMethod queryset) and/or content_type_id """
+    results = TestResult.objects.filter(passed=False)
+    if not include_xfail:
+        results = results.filter(xfail=False)
+    if test_methods is not None:
+        results = results.filter(test_method__in=test_methods)
+    if content_type_id is not None:
+        results = results.filter(content_type_id=content_type_id)
+    return results.order_by('pk')
+
+
+def _add_object_names(rows):
+    """ add the str() of each row's object, loaded with one in_bulk per content type """
+    object_ids = defaultdict(list)
+    for row in rows:
+        object_ids[row['content_type_id']].append(row['object_id'])
+    names = {}
+    for content_type_id, ids in object_ids.items():
+        model_class = resolver.model_class(content_type_id)
+        if model_class is not None:
+            objects = model_class._base_manager.using(db_for_read(model_class)).in_bulk(ids)
+            names.update({(content_type_id, pk): str(obj) for pk, obj in objects.items()})
+    for row in rows:
+        row['object'] = names.get((row['content_type_id'], row['object_id']), '')
+    return rows
+
+
+def iter_rows(results, chunk_size=None, with_objects=False):
+    """ dicts of the exported columns of results, with an 'object' column when with_objects """
+    chunk_size = get_chunk_size(chunk_size)
+    chunk = []
+    for values in results.values_list(*FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(dict(zip(COLUMNS, values)))
+        if len(chunk) == chunk_size:
+            yield from _add_object_names(chunk) if with_objects else chunk
+            chunk = []
+    yield from _add_object_names(chunk) if with_objects else chunk
+
+
+class _Echo(object):
+    """ file-like object that returns what is written to it, for using csv.writer as a generator """
+
+    def write(self, value):
+        return value
+
+
+def iter_lines(rows, format='csv', with_objects=False):
+    """ lines of rows exported as csv (with a header line) or json lines """
+    columns = COLUMNS + ('object',) if with_objects else COLUMNS
+    if format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([row[column] for column in columns])
+    else:
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
@@ -0,0 +1,31 @@
+from hashlib import blake2b
+import inspect
+
+from data_tests.constants import FINGERPRINT_SIZE
+
+
+def method_version(method):
+    """ the version= given to the test's decorator, or else a hash of the test's source, so that editing the test
+    invalidates its fingerprints """
+    version = getattr(method, 'version', None)
+    if version is not None:
+        return str(version)
+    try:
+        source = inspect.getsource(method).encode()
+    except (OSError, TypeError):
+        source = method.__code__.co_code
+    return blake2b(source, digest_size=FINGERPRINT_SIZE).hexdigest()
+
+
+def object_fingerprint(version, values):
+    """ fingerprint of one object, from the test's version and the values of its input fields """
+    return blake2b(repr((version, values)).encode(), digest_size=FINGERPRINT_SIZE).hexdigest()
+
+
+def table_fingerprint(version, rows):
+    """ fingerprint of every object, from (pk, input values...) rows in pk order, for class method tests whose
+    results depend on the whole table """
+    digest = blake2b(version.encode(), digest_size=FINGERPRINT_SIZE)
+    for row in rows:
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
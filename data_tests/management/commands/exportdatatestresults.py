@@ -0,0 +1,77 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError  # NOQA
+
+from data_tests.export import FORMATS, failing_results, iter_lines, iter_rows
+from data_tests.models import TestMethod
+
+
+class Command(BaseCommand):
+    args = ""
+    help = "Export failing test results as CSV or JSON lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-m",
+            "--model",
+            dest="model",
+            default=None
+        )
+        parser.add_argument(
+            "-t",
+            "--test",
+            dest="test_method",
+            default=None
+        )
+        parser.add_argument(
+            "--format",
+            dest="format",
+            choices=FORMATS,
+            default="csv"
+        )
+        parser.add_argument(
+            "--include-xfail",
+            dest="include_xfail",
+            action="store_true",
+            help="Also export failures that are supposed to fail"
+        )
+        parser.add_argument(
+            "--with-objects",
+            dest="with_objects",
+            action="store_true",
+            help="Add a column with the str() of each tested object"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            dest="chunk_size",
+            type=int,
+            default=None,
+            help="Number of results read per query (defaults to settings.DATA_TESTS_CHUNK_SIZE)"
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            dest="output",
+            default=None,
+            help="File to write to, instead of stdout"
+        )
+
+    def handle(self, *args, **options):
+        test_methods = None
+        content_type_id = None
+        if options.get('test_method'):
+            test_methods = TestMethod.objects.filter(method_name=options['test_method'])
+        if options.get('model'):
+            qs = ContentType.objects.filter(model__iexact=options['model'])
+            if qs.count() > 1:
+                raise CommandError('More than one %s model exists in codebase' % options['model'])
+            content_type_id = qs.get().pk
+
+        results = failing_results(test_methods, content_type_id, include_xfail=options['include_xfail'])
+        rows = iter_rows(results, chunk_size=options.get('chunk_size'), with_objects=options['with_objects'])
+        lines = iter_lines(rows, format=options['format'], with_objects=options['with_objects'])
+        if options.get('output'):
+            with open(options['output'], 'w', newline='') as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand  # NOQA
+
+from data_tests.pruning import prune
+
+
+class Command(BaseCommand):
+    args = ""
+    help = "Delete test methods that are no longer defined, and the test results of objects that no longer exist"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            dest="chunk_size",
+            type=int,
+            default=None,
+            help="Number of test results to delete per query (defaults to settings.DATA_TESTS_CHUNK_SIZE)"
+        )
+        parser.add_argument(
+            "--dry-run",
+            dest="dry_run",
+            action="store_true",
+            help="Only count what would be deleted"
+        )
+
+    def handle(self, *args, **options):
+        test_methods, results = prune(chunk_size=options.get('chunk_size'), dry_run=options.get('dry_run'))
+        self.stdout.write('{} {} test methods and {} test results'.format(
+            'Would delete' if options.get('dry_run') else 'Deleted', test_methods, results))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand  # NOQA
+
+from data_tests.models import TestMethod, TestMethodSummary
+
+
+class Command(BaseCommand):
+    args = ""
+    help = "Recount the passed/failed/xfail/not run summary of each test method from its test results"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-t",
+            "--test",
+            dest="test_method",
+            default=None
+        )
+
+    def handle(self, *args, **options):
+        test_methods = TestMethod.objects.all()
+        if options.get('test_method'):
+            test_methods = test_methods.filter(method_name=options['test_method'])
+        repaired = TestMethodSummary.rebuild(test_methods)
+        for summary in repaired:
+            self.stdout.write('{}: {} passed, {} failed, {} supposed to fail, {} not run'.format(
+                summary.test_method, summary.passed, summary.failed, summary.xfail, summary.not_run))
+        self.stdout.write('{} of {} summaries were missing or out of date'.format(len(repaired), test_methods.count()))
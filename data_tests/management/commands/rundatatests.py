@@ -1,8 +1,15 @@
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.core.management.base import BaseCommand  # NOQA
+from django.core.management.base import BaseCommand, CommandError  # NOQA
 
-from data_tests.models import TestMethod
+from data_tests.models import DirtyObject, TestMethod, TestRun
+from data_tests.profiling import profile_lines, write_profile_json
+from data_tests.pruning import prune
 from data_tests.registry import add_test_methods_to_database
+from data_tests.scheduling import estimate_tasks, makespan, schedule
+
+# Command line options that are passed through to TestMethod.run_test_methods
+RUN_OPTIONS = ('chunk_size', 'workers', 'shards', 'shard_boundaries', 'incremental', 'profile')
 
 
 class Command(BaseCommand):
@@ -22,21 +29,150 @@ class Command(BaseCommand):
             dest="test_method",
             default=None
         )
+        parser.add_argument(
+            "--chunk-size",
+            dest="chunk_size",
+            type=int,
+            default=None,
+            help="Number of objects to test per query (defaults to settings.DATA_TESTS_CHUNK_SIZE)"
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            dest="workers",
+            type=int,
+            default=1,
+            help="Number of worker processes to spread test methods over"
+        )
+        parser.add_argument(
+            "--shards",
+            dest="shards",
+            type=int,
+            default=1,
+            help="Split each test method into this many pk ranges, run concurrently when --workers > 1"
+        )
+        parser.add_argument(
+            "--shard-boundaries",
+            dest="shard_boundaries",
+            choices=["quantile", "minmax"],
+            default="quantile",
+            help="Split pk ranges into equal numbers of objects (quantile) or equal pk spans (minmax)"
+        )
+        parser.add_argument(
+            "--incremental",
+            dest="incremental",
+            action="store_true",
+            help="Only re-test objects changed since the last successful run of each test method"
+        )
+        parser.add_argument(
+            "--drain-queue",
+            dest="drain_queue",
+            action="store_true",
+            help="Only re-test objects queued by saves and deletes, see settings.DATA_TESTS_QUEUE_DIRTY_OBJECTS"
+        )
+        parser.add_argument(
+            "--profile",
+            dest="profile",
+            action="store_true",
+            help="Report wall time, queries and the slowest objects of each test method"
+        )
+        parser.add_argument(
+            "--profile-output",
+            dest="profile_output",
+            default=None,
+            help="Also write the profile of each test method to this file as JSON"
+        )
+        parser.add_argument(
+            "--prune",
+            dest="prune",
+            action="store_true",
+            help="First delete test methods that are no longer defined and the results of deleted objects, "
+                 "see prunedatatests"
+        )
+        parser.add_argument(
+            "--plan",
+            dest="plan",
+            action="store_true",
+            help="Print the estimated cost of each test method and of the whole run, without running anything"
+        )
 
     def handle(self, *args, **options):
         add_test_methods_to_database()
 
         model = options.get('model')
         test_method = options.get('test_method')
+        profile_output = options.get('profile_output') or getattr(settings, 'DATA_TESTS_PROFILE_OUTPUT', None)
+        profile_setting = getattr(settings, 'DATA_TESTS_PROFILE', False)
+        options['profile'] = bool(options.get('profile') or profile_output or profile_setting)
+        run_options = {key: options.get(key) for key in RUN_OPTIONS}
+        if options.get('plan'):
+            if options.get('drain_queue'):
+                raise CommandError('--plan cannot be used with --drain-queue')
+            self.write_plan(self.selected_test_methods(model, test_method), options)
+            return
+
+        if options.get('prune') or getattr(settings, 'DATA_TESTS_PRUNE', False):
+            self.stdout.write('Pruned {} test methods and {} test results'.format(
+                *prune(chunk_size=options.get('chunk_size'))))
+        test_run = TestRun.objects.create()
+        if options.get('drain_queue'):
+            reports = DirtyObject.drain(chunk_size=options.get('chunk_size'), profile=options['profile'])
+        else:
+            reports = TestMethod.run_test_methods(self.selected_test_methods(model, test_method), **run_options)
+
+        test_run.finish(reports)
+        self.write_reports(reports)
+        if options['profile']:
+            for line in profile_lines(reports):
+                self.stdout.write(line)
+            if profile_output:
+                write_profile_json(reports, profile_output)
+
+    def selected_test_methods(self, model, test_method):
         if test_method:
-            for tm in TestMethod.objects.filter(method_name=test_method):
-                tm.run_test_method()
-        elif model:
+            return TestMethod.objects.filter(method_name=test_method)
+        if model:
             qs = ContentType.objects.filter(model__iexact=model)
             if qs.count() > 1:
                 raise Exception('More than one %s model exists in codebase' % model)
-            model_class = qs.get().model_class()
-            TestMethod.rerun_tests_for_model(model_class)
-        else:
-            TestMethod.rerun_all_tests()
+            return TestMethod.objects.filter(content_type=qs.get())
+        return TestMethod.objects.all()
+
+    def write_plan(self, test_methods, options):
+        tasks = TestMethod.tasks_for(test_methods, options['shards'], options['shard_boundaries'])
+        estimates = schedule(estimate_tasks(tasks))
+        self.stdout.write('{:<40} {:>16} {:>10} {:>10}  {}'.format('Test', 'Pk range', 'Rows', 'Est. (s)', 'Source'))
+        for estimate in estimates:
+            pk_range = '{}-{}'.format(*estimate.pk_range) if estimate.pk_range else ''
+            self.stdout.write('{:<40} {:>16} {:>10} {:>10.2f}  {}'.format(
+                str(estimate.test_method)[:40], pk_range.replace('None', ''), estimate.rows, estimate.seconds,
+                estimate.source))
+        self.stdout.write('Predicted run time with {} worker(s): {:.2f}s'.format(
+            options['workers'], makespan(estimates, options['workers'])))
 
+    def write_reports(self, reports):
+        changed = [report for report in reports if report.has_changes]
+        errors = [report for report in reports if report.error]
+        if not changed:
+            self.stdout.write('No test results changed')
+        for report in changed:
+            self.stdout.write(str(report))
+            if report.newly_failing:
+                self.stdout.write('  newly failing: {}'.format(', '.join(map(str, report.newly_failing))))
+            if report.newly_passing:
+                self.stdout.write('  newly passing: {}'.format(', '.join(map(str, report.newly_passing))))
+        for report in reports:
+            if report.budget_exceeded:
+                self.stdout.write('{}: ran out of time, {} results not run'.format(report.title, report.not_run))
+            if report.repeat_timeouts:
+                self.stdout.write('{}: objects that timed out again: {}'.format(
+                    report.title, ', '.join(map(str, report.repeat_timeouts))))
+        skipped = sum(report.skipped for report in reports)
+        if skipped:
+            self.stdout.write('{} results skipped as their inputs were unchanged, {} re-tested'.format(
+                skipped, sum(report.tested for report in reports)))
+        for report in errors:
+            self.stderr.write(str(report))
+            self.stderr.write(report.error)
+        if errors:
+            self.stderr.write('{} of {} test methods could not be run'.format(len(errors), len(reports)))
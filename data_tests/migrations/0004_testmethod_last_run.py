@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_tests', '0003_auto_20200105_2116'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testmethod',
+            name='last_run',
+            field=models.DateTimeField(blank=True, help_text='Start of the last successful run, used as the high-water mark for incremental runs', null=True),
+        ),
+    ]
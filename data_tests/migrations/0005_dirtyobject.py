@@ -0,0 +1,28 @@
+# Generated by Django 3.0.14 on 2026-10-18 08:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('data_tests', '0004_testmethod_last_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyObject',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('claim', models.PositiveIntegerField(db_index=True, default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'unique_together': {('content_type', 'object_id', 'claim')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.0.14 on 2026-10-18 08:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_tests', '0005_dirtyobject'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.DurationField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ('-started',),
+            },
+        ),
+        migrations.CreateModel(
+            name='TestMethodRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started', models.DateTimeField()),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.DurationField(blank=True, null=True)),
+                ('objects_tested', models.PositiveIntegerField(default=0)),
+                ('results_updated', models.PositiveIntegerField(default=0)),
+                ('passed', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('xfail', models.PositiveIntegerField(default=0, verbose_name='Supposed to fail')),
+                ('newly_failing', models.PositiveIntegerField(default=0)),
+                ('newly_passing', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('test_method', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='data_tests.TestMethod')),
+                ('test_run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_method_runs', to='data_tests.TestRun')),
+            ],
+        ),
+    ]
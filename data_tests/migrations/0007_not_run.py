@@ -0,0 +1,23 @@
+# Generated by Django 3.0.14 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_tests', '0006_testrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testmethodrun',
+            name='not_run',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='testresult',
+            name='passed',
+            field=models.BooleanField(default=False, null=True),
+        ),
+    ]
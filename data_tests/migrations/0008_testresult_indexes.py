@@ -0,0 +1,43 @@
+# Generated by Django 3.0.14 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """ AddIndex that builds the index with CREATE INDEX CONCURRENTLY on PostgreSQL, so that a large results table
+    isn't locked against writes while it is built. Elsewhere it is a plain AddIndex """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super(AddIndexConcurrently, self).database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super(AddIndexConcurrently, self).database_backwards(app_label, schema_editor, from_state,
+                                                                        to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('data_tests', '0007_not_run'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='testresult',
+            index=models.Index(fields=['content_type', 'object_id'], name='data_tests_result_object_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='testresult',
+            index=models.Index(fields=['test_method', 'passed', 'xfail'], name='data_tests_result_status_idx'),
+        ),
+    ]
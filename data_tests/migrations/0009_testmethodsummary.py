@@ -0,0 +1,25 @@
+# Generated by Django 3.0.14 on 2026-10-18 08:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_tests', '0008_testresult_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestMethodSummary',
+            fields=[
+                ('test_method', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='data_tests.TestMethod')),
+                ('passed', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('xfail', models.IntegerField(default=0, verbose_name='Supposed to fail')),
+                ('not_run', models.IntegerField(default=0)),
+                ('modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_tests', '0009_testmethodsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testmethodrun',
+            name='skipped',
+            field=models.PositiveIntegerField(default=0, help_text='Results not re-tested, as their inputs were unchanged'),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='fingerprint',
+            field=models.CharField(blank=True, help_text='Hash of the test version and the inputs the result was computed from', max_length=16),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_tests', '0010_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dirtyobject',
+            name='claimed',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_tests', '0011_dirtyobject_claimed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testmethod',
+            name='fingerprint',
+            field=models.CharField(blank=True, help_text='Hash of the test version and the inputs of every object the results of a class method test were computed from', max_length=16),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_tests', '0012_testmethod_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='testresult',
+            name='object_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
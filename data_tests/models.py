@@ -1,22 +1,113 @@
 # -*- coding: utf-8 -*-
 
+from collections import defaultdict
+from collections.abc import Mapping
+from contextlib import ExitStack
+from datetime import timedelta
 from functools import lru_cache
 import logging
+import random
+import time
+import traceback
 
-from django.apps import apps
+from django.conf import settings
 from django.contrib.contenttypes import fields
 from django.contrib.contenttypes.models import ContentType
-from django.db import models, router
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connections, models, router, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Value, When
 from django.urls import reverse
+from django.utils import timezone
 from model_utils.models import TimeStampedModel
 
-from data_tests.constants import MAX_MESSAGE_LENGTH
+from data_tests.constants import (
+    ANTI_JOIN_VENDORS, DEFAULT_CHUNK_SIZE, DEFAULT_CLAIM_TIMEOUT, FINGERPRINT_SIZE, MAX_CLAIM, MAX_MESSAGE_LENGTH,
+    NOT_RUN_BUDGET_EXCEEDED, NOT_RUN_TIMED_OUT, TEST_ERROR_PREFIX
+)
+from data_tests import resolver
+from data_tests.fingerprints import method_version, object_fingerprint, table_fingerprint
+from data_tests.profiling import TestMethodProfile
+from data_tests.reports import TestMethodReport
+from data_tests.timeouts import ObjectTimeout, time_limit
 
 logger = logging.getLogger(__name__)
 
 db_for_read = lru_cache()(router.db_for_read)
 
 
+def get_chunk_size(chunk_size=None):
+    """ chunk size to use for batched test runs, falling back to settings.DATA_TESTS_CHUNK_SIZE """
+    return chunk_size or getattr(settings, 'DATA_TESTS_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def pk_range_filter(pk_range, field='pk'):
+    """ filter kwargs restricting field to pk_range, a (start, end) tuple where start is inclusive, end is exclusive
+    and either may be None for an open range """
+    if pk_range is None:
+        return {}
+    start, end = pk_range
+    kwargs = {}
+    if start is not None:
+        kwargs[field + '__gte'] = start
+    if end is not None:
+        kwargs[field + '__lt'] = end
+    return kwargs
+
+
+def iter_queryset_chunks(queryset, chunk_size=None):
+    """ yield lists of the objects in queryset in pk order, chunk_size at a time, seeking on pk rather than using
+    OFFSET so every chunk costs the same """
+    chunk_size = get_chunk_size(chunk_size)
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = list((queryset if last_pk is None else queryset.filter(pk__gt=last_pk))[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def parse_method_result(method_result):
+    """ normalise the return value of a test method to a (passed, message) tuple """
+    if type(method_result) is bool:
+        return method_result, ''
+    passed, message = method_result
+    return passed, message[0:MAX_MESSAGE_LENGTH] if message else ''
+
+
+def add_to_counts(counts, passed, xfail, sign=1):
+    """ add the result (passed, xfail) to counts, a defaultdict(int) of TestMethodSummary counts, or take it away
+    with sign=-1 """
+    if passed is None:
+        counts['not_run'] += sign
+    elif passed:
+        counts['passed'] += sign
+    else:
+        counts['failed'] += sign
+        if xfail:
+            counts['xfail'] += sign
+
+
+class TestRunContext(object):
+    """ Evaluation state shared by every test run within a single run, so that class method tests are only
+    evaluated once however many objects are checked against them """
+
+    def __init__(self):
+        self._failing_pks = {}
+
+    def class_method_result(self, test_method):
+        """ return (failing pks, message) for a class method test, evaluating its queryset on first use """
+        if test_method.pk not in self._failing_pks:
+            qs_failing, message = test_method.class_method_result()
+            self._failing_pks[test_method.pk] = frozenset(qs_failing.values_list('pk', flat=True)), message
+        return self._failing_pks[test_method.pk]
+
+    def is_failing(self, test_method, pk):
+        failing_pks, message = self.class_method_result(test_method)
+        return pk in failing_pks, message
+
+
 class TestMethod(models.Model):
     class Meta:
         unique_together = ('content_type', 'method_name')
@@ -25,6 +116,12 @@ class TestMethod(models.Model):
     method_name = models.CharField(max_length=256)
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='test_methods')
     is_class_method = models.BooleanField()
+    last_run = models.DateTimeField(blank=True, null=True,
+                                    help_text='Start of the last successful run, used as the high-water mark for '
+                                              'incremental runs')
+    fingerprint = models.CharField(max_length=2 * FINGERPRINT_SIZE, blank=True,
+                                   help_text='Hash of the test version and the inputs of every object the results of '
+                                             'a class method test were computed from')
 
     def __str__(self):
         return self.title
@@ -33,32 +130,334 @@ class TestMethod(models.Model):
         return super(TestMethod, self).save(*args, **kwargs)
 
     def model_class(self):
-        return self.content_type.model_class()
+        return resolver.model_class(self.content_type_id)
 
     def method(self):
-        return getattr(self.model_class(), self.method_name)
+        return resolver.test_callable(self)
+
+    def change_field(self):
+        """ name of the field used to find objects changed since the last run, see registry.test_method """
+        return getattr(self.method(), 'change_field', None)
+
+    def changed_object_ids(self, since):
+        """ pks of the objects whose change field is at least since, as a subquery where possible """
+        model_class = self.model_class()
+        db_alias = db_for_read(model_class)
+        object_ids = model_class._base_manager.using(db_alias).filter(
+            **{self.change_field() + '__gte': since}).values_list('pk', flat=True)
+        if db_alias != router.db_for_write(TestResult):
+            return list(object_ids)
+        return object_ids
+
+    def results_in_range(self, pk_range=None):
+        return self.test_results.filter(**pk_range_filter(pk_range, 'object_id'))
+
+    def pk_ranges(self, shards, boundaries='quantile'):
+        """ split the tested model's pks into shards (start, end) ranges. 'quantile' boundaries give every shard
+        the same number of objects, 'minmax' splits the range between the smallest and largest pk evenly """
+        objects = self.model_class()._base_manager.using(db_for_read(self.model_class()))
+        if boundaries == 'minmax':
+            bounds = objects.aggregate(min_pk=models.Min('pk'), max_pk=models.Max('pk'))
+            if bounds['min_pk'] is None:
+                return [(None, None)]
+            step = (bounds['max_pk'] - bounds['min_pk']) / shards
+            cuts = [bounds['min_pk'] + int(step * i) for i in range(1, shards)]
+        else:
+            count = objects.count()
+            pks = objects.order_by('pk').values_list('pk', flat=True)
+            cuts = [pks[count * i // shards] for i in range(1, shards)] if count else []
+        cuts = sorted(set(cuts))
+        # The outer ranges are left open so objects created during the run are still covered
+        return list(zip([None] + cuts, cuts + [None]))
 
     def delete_stale_results(self):
-        deleted, _ = self.test_results.filter(object_id__isnull=True).delete()
+        stale = self.test_results.filter(object_id__isnull=True)
+        counts = TestMethodSummary.counts_of(stale)
+        deleted, _ = stale.delete()
         if deleted:
             logger.info('Deleted {} stale test results'.format(deleted))
+            TestMethodSummary.subtract_all(counts)
+
+    def add_new_result_objects(self, chunk_size=None, pk_range=None):
+        """ create empty test results for every object that doesn't have one yet, without loading all pks
+        into memory. Returns the number created """
+        model_class = self.model_class()
+        db_alias = db_for_read(model_class)
+        if db_alias == router.db_for_write(TestResult) and connections[db_alias].vendor in ANTI_JOIN_VENDORS:
+            created = self._insert_new_result_objects(model_class, db_alias, pk_range)
+        else:
+            created = self._merge_new_result_objects(model_class, db_alias, chunk_size, pk_range)
+        if created:
+            logger.info('Added {} new test results'.format(created))
+        return created
+
+    def add_result_objects_for(self, object_ids):
+        """ create empty test results for those of object_ids that exist and don't have a result yet. Returns the
+        number created """
+        model_class = self.model_class()
+        object_ids = list(model_class._base_manager.using(db_for_read(model_class)).filter(
+            pk__in=object_ids).values_list('pk', flat=True))
+        existing = set(self.test_results.filter(object_id__in=object_ids).values_list('object_id', flat=True))
+        to_insert = [TestResult(test_method=self, content_type_id=self.content_type_id, object_id=pk)
+                     for pk in object_ids if pk not in existing]
+        return TestResult.insert_new(to_insert)
+
+    def _insert_new_result_objects(self, model_class, db_alias, pk_range=None):
+        """ INSERT ... SELECT ... WHERE NOT EXISTS, so the anti-join happens entirely in the database """
+        connection = connections[db_alias]
+        qn = connection.ops.quote_name
+        now = timezone.now()
+        values = {'created': now, 'modified': now, 'content_type': self.content_type_id, 'test_method': self.pk}
+        # Every other column takes its field's default, so that fields added to TestResult are filled in too
+        fields = [field for field in TestResult._meta.concrete_fields
+                  if not field.primary_key and field.name != 'object_id']
+        params = [field.get_db_prep_save(values[field.name] if field.name in values else field.get_default(),
+                                         connection) for field in fields]
+
+        params.append(self.pk)
+        range_sql = ''
+        for lookup, value in pk_range_filter(pk_range).items():
+            range_sql += ' AND obj.{pk} >= %s' if lookup.endswith('__gte') else ' AND obj.{pk} < %s'
+            params.append(value)
+
+        sql = ('INSERT INTO {result_table} ({columns}, {object_id}) '
+               'SELECT {placeholders}, obj.{pk} FROM {table} obj WHERE NOT EXISTS ('
+               'SELECT 1 FROM {result_table} result '
+               'WHERE result.{test_method_id} = %s AND result.{object_id} = obj.{pk})' + range_sql).format(
+            result_table=qn(TestResult._meta.db_table),
+            columns=', '.join(qn(field.column) for field in fields),
+            object_id=qn(TestResult._meta.get_field('object_id').column),
+            test_method_id=qn(TestResult._meta.get_field('test_method').column),
+            placeholders=', '.join(['%s'] * len(fields)),
+            table=qn(model_class._meta.db_table),
+            pk=qn(model_class._meta.pk.column),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            created = cursor.rowcount
+        # New results start out failing
+        TestMethodSummary.apply(self.pk, {'failed': created})
+        return created
+
+    def _merge_new_result_objects(self, model_class, db_alias, chunk_size=None, pk_range=None):
+        """ merge pk-ordered chunks of objects against the existing results in the same pk range, for when the
+        tested model and TestResult live in different databases """
+        chunk_size = get_chunk_size(chunk_size)
+        object_pks = model_class._base_manager.using(db_alias).filter(**pk_range_filter(pk_range)).order_by(
+            'pk').values_list('pk', flat=True)
+        created = 0
+        last_pk = None
+        while True:
+            chunk = object_pks if last_pk is None else object_pks.filter(pk__gt=last_pk)
+            chunk = list(chunk[:chunk_size])
+            if not chunk:
+                return created
+            last_pk = chunk[-1]
+            existing = set(self.test_results.filter(object_id__gte=chunk[0], object_id__lte=last_pk)
+                           .values_list('object_id', flat=True))
+            to_insert = [TestResult(test_method=self, content_type_id=self.content_type_id, object_id=pk)
+                         for pk in chunk if pk not in existing]
+            created += TestResult.insert_new(to_insert)
+
+    def run_on_object(self, obj, timeout=None):
+        """ run this (instance) test against obj, returning a (passed, message) tuple. passed is None when the test
+        was interrupted for running longer than timeout seconds """
+        try:
+            with time_limit(timeout):
+                method_result = self.method()(obj)
+        except ObjectTimeout:
+            return None, NOT_RUN_TIMED_OUT.format(timeout)
+        except Exception as e:
+            method_result = False, '{} {}'.format(TEST_ERROR_PREFIX, str(e))
+        return parse_method_result(method_result)
+
+    def objects_to_test(self, manager):
+        """ all of manager's objects, loaded as the test's select_related, prefetch_related, only and defer hints
+        ask for, see registry.test_method """
+        queryset = manager.all()
+        for name, hint_fields in getattr(self.method(), 'fetch_hints', {}).items():
+            queryset = getattr(queryset, name)(*hint_fields)
+        return queryset
 
-    def add_new_result_objects(self):
-        all_object_pks = set(self.model_class()._base_manager.values_list('pk', flat=True))
-        existing_test_results = set(self.test_results.values_list('object_id', flat=True))
-        to_insert = []
-        for new_id in all_object_pks - existing_test_results:
-            to_insert.append(TestResult(test_method=self, content_type=self.content_type, object_id=new_id))
+    def inputs(self):
+        """ fields of the tested model that the test depends on, see registry.test_method """
+        return getattr(self.method(), 'inputs', ())
 
-        TestResult.objects.bulk_create(to_insert)
+    def version(self):
+        return method_version(self.method())
 
-    def _run_test_method_instance(self):
-        for result in self.test_results.all():
-            result.run_test_method()
+    def input_fingerprints(self, object_ids, version):
+        """ {pk: fingerprint of the object's inputs} for those of object_ids that exist """
+        model_class = self.model_class()
+        rows = model_class._base_manager.using(db_for_read(model_class)).filter(pk__in=object_ids).values_list(
+            'pk', *self.inputs())
+        return {row[0]: object_fingerprint(version, row[1:]) for row in rows}
+
+    def table_input_fingerprint(self, version):
+        """ fingerprint of the inputs of every object, for class method tests """
+        model_class = self.model_class()
+        rows = model_class._base_manager.using(db_for_read(model_class)).order_by('pk').values_list(
+            'pk', *self.inputs())
+        return table_fingerprint(version, rows.iterator())
+
+    def chunk_fingerprints(self, chunk, version):
+        """ the fingerprints of a chunk of results' objects (none for tests without inputs), and the pks of the
+        results whose stored fingerprint still matches, which are not re-tested """
+        if version is None:
+            return {}, set()
+        fingerprints = self.input_fingerprints([result.object_id for result in chunk], version)
+        # Objects that no longer exist have no fingerprint, so their results never match
+        unchanged = {result.pk for result in chunk
+                     if result.passed is not None and result.fingerprint == fingerprints.get(result.object_id)}
+        return fingerprints, unchanged
+
+    def timeout(self):
+        """ seconds an instance test may spend on a single object, see registry.test_method """
+        return getattr(self.method(), 'timeout', None) or getattr(settings, 'DATA_TESTS_OBJECT_TIMEOUT', None)
+
+    def budget(self):
+        """ seconds an instance test may spend on a single run, see registry.test_method """
+        return getattr(self.method(), 'budget', None) or getattr(settings, 'DATA_TESTS_METHOD_BUDGET', None)
+
+    @staticmethod
+    def _write_results(report, chunk, outcomes, fingerprints=None):
+        """ bulk_update the results in chunk whose (passed, message) in outcomes, a dict keyed on result pk, differs
+        from the stored value. Results left out of outcomes were skipped as unchanged. With fingerprints, a dict keyed
+        on object id, the fingerprint of each result that was run is stored too """
+        now = timezone.now()
+        changed = []
+        counts = defaultdict(int)
+        for result in chunk:
+            if result.pk not in outcomes:
+                report.skipped += 1
+                continue
+            passed, message = outcomes[result.pk]
+            if passed is None:
+                report.not_run += 1
+            else:
+                report.tested += 1
+            fingerprint = result.fingerprint
+            if fingerprints is not None:
+                # Results that were not run, or whose test raised, are re-tested next time
+                errored = passed is None or message.startswith(TEST_ERROR_PREFIX)
+                fingerprint = '' if errored else fingerprints.get(result.object_id, '')
+            is_new = result.created >= report.started
+            if is_new or passed != result.passed or message != result.message or fingerprint != result.fingerprint:
+                report.record(result.object_id, passed, None if is_new else result.passed)
+                add_to_counts(counts, result.passed, result.xfail, sign=-1)
+                add_to_counts(counts, passed, result.xfail)
+                result.passed, result.message, result.fingerprint, result.modified = passed, message, fingerprint, now
+                changed.append(result)
+        if changed:
+            TestResult.objects.bulk_update(changed, ['passed', 'message', 'fingerprint', 'modified'])
+            TestMethodSummary.apply(report.test_method_id, counts)
+
+    def _run_test_method_instance(self, report, results, chunk_size=None):
+        model_class = self.model_class()
+        manager = model_class._base_manager.using(db_for_read(model_class))
+        missing = False, '{} {} matching query does not exist.'.format(
+            TEST_ERROR_PREFIX, model_class._meta.object_name)
+        timeout, budget = self.timeout(), self.budget()
+        deadline = time.perf_counter() + budget if budget else None
+        objects_to_test = self.objects_to_test(manager)
+        version = self.version() if self.inputs() else None
+        for chunk in iter_queryset_chunks(results, chunk_size):
+            fingerprints, unchanged = self.chunk_fingerprints(chunk, version)
+            objects = objects_to_test.in_bulk([result.object_id for result in chunk if result.pk not in unchanged])
+            outcomes = {}
+            for result in chunk:
+                if result.pk in unchanged:
+                    continue
+                obj = objects.get(result.object_id)
+                if report.budget_exceeded:
+                    outcomes[result.pk] = None, NOT_RUN_BUDGET_EXCEEDED
+                    continue
+                if obj is None:
+                    outcomes[result.pk] = missing
+                    continue
+                start = time.perf_counter()
+                outcomes[result.pk] = self.run_on_object(obj, timeout)
+                finish = time.perf_counter()
+                if report.profile:
+                    report.profile.record_object(result.object_id, finish - start)
+                if timeout and finish - start > timeout:
+                    # Tests that can't be interrupted (see timeouts.time_limit) are not run if they took too long
+                    timed_out = None, NOT_RUN_TIMED_OUT.format(timeout)
+                    report.add_timed_out(result.object_id, repeated=(result.passed, result.message) == timed_out)
+                    outcomes[result.pk] = timed_out
+                if deadline and finish > deadline:
+                    report.budget_exceeded = True
+            self._write_results(report, chunk, outcomes, fingerprints)
+            if report.budget_exceeded:
+                self._skip_remaining(report, results, chunk[-1].pk)
+                break
+
+    def _skip_remaining(self, report, results, last_pk):
+        """ mark the results after last_pk as not run, once the test has run out of its budget """
+        logger.warning('{} ran out of its {}s budget, the remaining objects are not run'.format(self, self.budget()))
+        remaining = results.filter(pk__gt=last_pk)
+        counts = TestMethodSummary.counts_of(remaining).get(self.pk, {})
+        not_run = remaining.update(passed=None, message=NOT_RUN_BUDGET_EXCEEDED, modified=timezone.now())
+        report.not_run += not_run
+        report.updated += not_run
+        counts = {name: -count for name, count in counts.items()}
+        counts['not_run'] = counts.get('not_run', 0) + not_run
+        TestMethodSummary.apply(self.pk, counts)
+
+    def is_batch_method(self):
+        """ whether this is a test_batch_method, run against a chunk of objects at a time """
+        return getattr(self.method(), 'is_batch_method', False)
+
+    def run_batch(self, object_ids):
+        """ run this batch test against the objects with object_ids in a single call, returning a (passed, message)
+        tuple for each that exists, keyed on pk """
+        method = self.method()
+        model_class = self.model_class()
+        objects = self.objects_to_test(model_class._base_manager.using(db_for_read(model_class))).filter(
+            pk__in=object_ids)
+        if method.batch_values:
+            objects = list(objects.values('pk', *method.batch_values))
+            pks = [row['pk'] for row in objects]
+        else:
+            objects = list(objects)
+            pks = [obj.pk for obj in objects]
+        try:
+            returned = method(objects) or {}
+            if not isinstance(returned, Mapping):
+                raise TypeError('batch tests must return a mapping of pk to result, not {}'.format(
+                    type(returned).__name__))
+        except Exception as e:
+            failed = False, '{} {}'.format(TEST_ERROR_PREFIX, str(e))
+            return {pk: failed for pk in pks}
+        outcomes = {}
+        for pk in pks:
+            # Objects left out of the returned mapping pass. Anything other than a (passed, message) tuple is taken
+            # as passed, so that e.g. numpy booleans can be returned as they are
+            method_result = returned.get(pk, True)
+            outcomes[pk] = parse_method_result(method_result if isinstance(method_result, tuple)
+                                               else bool(method_result))
+        return outcomes
+
+    def _run_test_method_batch(self, report, results, chunk_size=None):
+        missing = False, '{} {} matching query does not exist.'.format(
+            TEST_ERROR_PREFIX, self.model_class()._meta.object_name)
+        budget = self.budget()
+        deadline = time.perf_counter() + budget if budget else None
+        version = self.version() if self.inputs() else None
+        for chunk in iter_queryset_chunks(results, chunk_size):
+            fingerprints, unchanged = self.chunk_fingerprints(chunk, version)
+            to_run = [result for result in chunk if result.pk not in unchanged]
+            outcomes = self.run_batch([result.object_id for result in to_run]) if to_run else {}
+            self._write_results(report, chunk, {result.pk: outcomes.get(result.object_id, missing)
+                                                for result in to_run}, fingerprints)
+            if deadline and time.perf_counter() > deadline:
+                report.budget_exceeded = True
+                self._skip_remaining(report, results, chunk[-1].pk)
+                break
 
     def class_method_result(self):
         assert self.is_class_method
-        results = getattr(self.model_class(), self.method_name)()
+        results = self.method()()
         if type(results) is tuple:
             failing, message = results
         else:
@@ -67,150 +466,579 @@ class TestMethod(models.Model):
 
         return failing, message
 
-    def _run_test_method_class(self):
+    def _run_test_method_class(self, report, results, pk_range=None, chunk_size=None, created=0):
+        # The fingerprint of the whole table is stored once, on the test method, rather than on every result
+        fingerprint = self.table_input_fingerprint(self.version()) if self.inputs() else ''
+        if fingerprint and fingerprint == self.fingerprint and not created:
+            report.skipped = results.count()
+            return
         try:
             qs_failing, message = self.class_method_result()
+            message = (message or '')[0:MAX_MESSAGE_LENGTH]
+            qs_failing = qs_failing.filter(**pk_range_filter(pk_range))
+            if qs_failing.db != router.db_for_write(TestResult):
+                self._write_class_results_chunked(report, results, qs_failing, message, chunk_size)
+            else:
+                failing = Q(object_id__in=qs_failing.values_list('pk', flat=True))
+                self._write_class_results(report, results, failing, message)
+        except Exception as e:
+            message = ('{} {}'.format(TEST_ERROR_PREFIX, str(e)))[0:MAX_MESSAGE_LENGTH]
+            self._write_class_results(report, results, Q(pk__isnull=False), message)
+            # Re-run the test next time, whether or not its inputs change
+            fingerprint = ''
+        if fingerprint != self.fingerprint:
+            TestMethod.objects.filter(pk=self.pk).update(fingerprint=fingerprint)
+            self.fingerprint = fingerprint
 
-            # Update failing results
-            self.test_results.filter(object_id__in=qs_failing.values_list('id', flat=True)).update(passed=False,
-                                                                                                   message=message or '')
-            # Update passing results
-            self.test_results.exclude(object_id__in=qs_failing.values_list('id', flat=True)).update(passed=True,
-                                                                                                    message='')
+    def _write_class_results(self, report, results, failing, message):
+        """ set every result matching failing to failed with message and the rest to passed, with a single UPDATE
+        that only touches rows whose value changes """
+        is_new = Q(created__gte=report.started)
+        report.tested = results.count()
+        # Only the (normally few) results that flip between passing and failing are read back for the report.
+        # ~Q(passed=...) also matches results that were not run
+        flipped = results.filter((failing & (~Q(passed=False) | is_new)) | (~failing & (~Q(passed=True) | is_new)))
+        flipped = flipped.annotate(now_failing=Case(When(failing, then=Value(True)), default=Value(False),
+                                                    output_field=models.BooleanField()))
+        counts = defaultdict(int)
+        for object_id, now_failing, passed, xfail in flipped.values_list(
+                'object_id', 'now_failing', 'passed', 'xfail').iterator():
+            if now_failing:
+                report.add_newly_failing([object_id])
+            else:
+                report.add_newly_passing([object_id])
+            add_to_counts(counts, passed, xfail, sign=-1)
+            add_to_counts(counts, not now_failing, xfail)
+        TestMethodSummary.apply(self.pk, counts)
 
-        except Exception as e:
-            self.test_results.update(passed=False, message="Test failed to run correctly! {}".format(str(e)))
-
-    def run_test_method(self):
-        logger.info('Running test: {} {}'.format(self.content_type, self))
-        self.delete_stale_results()
-        self.add_new_result_objects()
-        if self.is_class_method:
-            self._run_test_method_class()
-        else:
-            self._run_test_method_instance()
+        changed = (failing & (~Q(passed=False) | ~Q(message=message))) | \
+            (~failing & (~Q(passed=True) | ~Q(message=''))) | is_new
+        report.updated += results.filter(changed).update(
+            passed=Case(When(failing, then=Value(False)), default=Value(True), output_field=models.BooleanField()),
+            message=Case(When(failing, then=Value(message)), default=Value(''), output_field=models.CharField()),
+            modified=timezone.now(),
+        )
+
+    def _write_class_results_chunked(self, report, results, qs_failing, message, chunk_size=None):
+        """ for a tested model in a different database to TestResult, where qs_failing can't be used as a
+        subquery: look up which of each chunk of results' objects are failing and write the changes in bulk """
+        for chunk in iter_queryset_chunks(results, chunk_size):
+            failing_ids = set(qs_failing.filter(pk__in=[result.object_id for result in chunk]).values_list(
+                'pk', flat=True))
+            outcomes = {result.pk: (False, message) if result.object_id in failing_ids else (True, '')
+                        for result in chunk}
+            self._write_results(report, chunk, outcomes)
+
+    def run_test_method(self, chunk_size=None, pk_range=None, incremental=False, object_ids=None, profile=False):
+        """ run this test against every object, or only those with pks in pk_range or object_ids, writing only the
+        results that changed. When incremental, only objects changed since last_run, objects without a result and
+        objects whose result was not run are tested. Returns a TestMethodReport of the objects that are newly failing
+        or newly passing. With profile, report.profile records the wall time, queries and per-object timings of the
+        run """
+        logger.info('Running test: {} {}{}'.format(resolver.content_type(self.content_type_id), self,
+                                                   ' (pks {} to {})'.format(*pk_range) if pk_range else ''))
+        report = TestMethodReport(self)
+        with ExitStack() as stack:
+            if profile:
+                report.profile = TestMethodProfile()
+                stack.enter_context(report.profile.capture())
+            self.delete_stale_results()
+            if object_ids is not None:
+                created = self.add_result_objects_for(object_ids)
+                scope = self.test_results.filter(object_id__in=object_ids)
+            else:
+                created = self.add_new_result_objects(chunk_size=chunk_size, pk_range=pk_range)
+                scope = self.results_in_range(pk_range)
+
+            results = scope
+            if incremental:
+                if self.last_run and self.change_field():
+                    logger.info('Only testing objects with {} since {}'.format(self.change_field(), self.last_run))
+                    # Results left not run by a timeout or an exceeded budget are tried again
+                    changed = Q(object_id__in=self.changed_object_ids(self.last_run))
+                    results = results.filter(changed | Q(created__gte=report.started) | Q(passed__isnull=True))
+                else:
+                    logger.info('No previous run or change field, testing every object')
+
+            if self.is_class_method:
+                self._run_test_method_class(report, results, pk_range=pk_range, chunk_size=chunk_size,
+                                            created=created)
+            elif self.is_batch_method():
+                self._run_test_method_batch(report, results, chunk_size=chunk_size)
+            else:
+                self._run_test_method_instance(report, results, chunk_size=chunk_size)
 
-        results = self.test_results.all()
+            counts = scope.aggregate(
+                passed_count=Count('pk', filter=Q(passed=True)),
+                failed_count=Count('pk', filter=Q(passed=False)),
+                xfail_count=Count('pk', filter=Q(passed=False, xfail=True)),
+            )
+            report.set_counts(counts['passed_count'], counts['failed_count'], counts['xfail_count'])
+        report.finished = timezone.now()
         logger.info('Test completed: {} successful, {} failing (of which {} are supposed to fail)\n'.format(
-            results.filter(passed=True).count(),
-            results.filter(passed=False).count(),
-            results.filter(passed=False, xfail=True).count()
-        ))
+            report.passed, report.failed, report.xfail))
+        logger.info(str(report))
+        return report
+
+    def try_run_test_method(self, **kwargs):
+        """ run_test_method, returning a report with the traceback in report.error if the test method raises,
+        so that one broken test method doesn't stop the rest of a run """
+        try:
+            return self.run_test_method(**kwargs)
+        except Exception:
+            logger.exception('Error running test: {}'.format(self))
+            report = TestMethodReport(self)
+            report.error = traceback.format_exc()
+            return report
 
     @classmethod
-    def rerun_tests_for_model(cls, model):
-        ct = ContentType.objects.get(app_label=model._meta.app_label, model=model._meta.model_name)
-        for test_method in cls.objects.filter(content_type=ct):
-            test_method.run_test_method()
+    def tasks_for(cls, test_methods, shards=1, shard_boundaries='quantile'):
+        """ (test method, pk range) pairs to run, with a pk range of None for a test method run in one go. Class
+        method tests are never sharded, as every shard would evaluate the class method over the whole table """
+        if shards > 1:
+            return [(test_method, pk_range) for test_method in test_methods
+                    for pk_range in ([None] if test_method.is_class_method
+                                     else test_method.pk_ranges(shards, shard_boundaries))]
+        return [(test_method, None) for test_method in test_methods]
 
     @classmethod
-    def rerun_all_tests(cls):
-        for test_method in cls.objects.all():
-            test_method.run_test_method()
+    def run_test_methods(cls, test_methods, workers=1, shards=1, shard_boundaries='quantile', **kwargs):
+        """ run each of test_methods, spread over a pool of worker processes when workers > 1. With shards > 1
+        each test method is split into that many pk ranges which are run separately, and their reports merged.
+        Worker processes take the tasks longest first, by their estimated cost (see data_tests.scheduling).
+        last_run is set for every test method that ran without errors """
+        tasks = cls.tasks_for(test_methods, shards, shard_boundaries)
+        if workers > 1:
+            from data_tests.parallel import run_test_methods_in_parallel
+            from data_tests.scheduling import estimate_tasks, schedule
+            # Longest first, so that the pool isn't left waiting on a long test method that started last
+            tasks = [(estimate.test_method, estimate.pk_range) for estimate in schedule(estimate_tasks(tasks))]
+            reports = run_test_methods_in_parallel(tasks, workers, **kwargs)
+        else:
+            reports = [test_method.try_run_test_method(pk_range=pk_range, **kwargs) for test_method, pk_range in tasks]
+        reports = TestMethodReport.merge_all(reports)
+
+        # Advance the high-water mark for incremental runs once every shard of a test method has succeeded
+        for report in reports:
+            if not report.error:
+                cls.objects.filter(pk=report.test_method_id).update(last_run=report.started)
+        return reports
+
+    @classmethod
+    def rerun_tests_for_model(cls, model, **kwargs):
+        return cls.run_test_methods(cls.objects.filter(content_type=resolver.content_type_for_model(model)), **kwargs)
+
+    @classmethod
+    def rerun_all_tests(cls, **kwargs):
+        return cls.run_test_methods(cls.objects.all(), **kwargs)
+
+    @classmethod
+    def rerun_tests_for_object_ids(cls, content_type_id, object_ids, **kwargs):
+        """ re-test the objects of one content type with the given pks, deleting the results of any that no longer
+        exist """
+        model_class = resolver.model_class(content_type_id)
+        if model_class is None:
+            return []
+        existing = set(model_class._base_manager.using(db_for_read(model_class)).filter(
+            pk__in=object_ids).values_list('pk', flat=True))
+        deleted = [object_id for object_id in object_ids if object_id not in existing]
+        if deleted:
+            deleted_results = TestResult.objects.filter(content_type_id=content_type_id, object_id__in=deleted)
+            counts = TestMethodSummary.counts_of(deleted_results)
+            deleted_results.delete()
+            TestMethodSummary.subtract_all(counts)
+        if not existing:
+            return []
+        return [test_method.run_test_method(object_ids=sorted(existing), **kwargs)
+                for test_method in cls.objects.filter(content_type_id=content_type_id)]
 
     @classmethod
     def add_test_methods_for_content_type(cls, content_type):
-        from data_tests.registry import registry
-        for method_name, defaults in registry[content_type].items():
-            cls.objects.update_or_create(
-                content_type=content_type,
-                method_name=method_name,
-                defaults=defaults
-            )
+        from data_tests.registry import sync_test_methods
+        sync_test_methods([content_type])
 
 
 class TestResult(TimeStampedModel):
     test_method = models.ForeignKey(TestMethod, on_delete=models.CASCADE, related_name='test_results')
     message = models.CharField(max_length=MAX_MESSAGE_LENGTH)
-    passed = models.BooleanField(default=False)
+    # None when the test was not run, because its test method ran out of time
+    passed = models.BooleanField(default=False, null=True)
     xfail = models.BooleanField(default=False, verbose_name="Supposed to fail")
     justification = models.CharField(blank=True, max_length=500)
 
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='test_results')
-    object_id = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+    object_id = models.PositiveIntegerField(blank=True, null=True)
+    content_object = fields.GenericForeignKey()
+    fingerprint = models.CharField(max_length=2 * FINGERPRINT_SIZE, blank=True,
+                                   help_text='Hash of the test version and the inputs the result was computed from')
 
     def __str__(self):
         return str(self.test_method)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(TestResult, cls).from_db(db, field_names, values)
+        # The stored state, so that save() can update TestMethodSummary. Unknown when either field is deferred
+        if 'passed' in instance.__dict__ and 'xfail' in instance.__dict__:
+            instance._summary_state = (instance.passed, instance.xfail)
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        previous = getattr(self, '_summary_state', None)
+        super(TestResult, self).save(*args, **kwargs)
+        if adding or previous is not None:
+            counts = defaultdict(int)
+            if previous is not None:
+                add_to_counts(counts, *previous, sign=-1)
+            add_to_counts(counts, self.passed, self.xfail)
+            TestMethodSummary.apply(self.test_method_id, counts)
+            self._summary_state = (self.passed, self.xfail)
+
     class Meta:
         unique_together = ('test_method', 'object_id', 'content_type')
+        # See benchmarks/result_indexes.py for the queries these are chosen for. Results without an object (see
+        # TestMethod.delete_stale_results) are found with the unique_together index, which starts with
+        # (test_method, object_id), so they don't need a partial index of their own. Between them, these two
+        # indexes serve every lookup on object_id, which has no index of its own
+        indexes = [
+            # The results of an object, e.g. when it is saved in the admin
+            models.Index(fields=['content_type', 'object_id'], name='data_tests_result_object_idx'),
+            # Passed/failed counts of a run and the admin's passed and xfail filters
+            models.Index(fields=['test_method', 'passed', 'xfail'], name='data_tests_result_status_idx'),
+        ]
 
     @staticmethod
-    @lru_cache()
     def get_model_class_from_content_type(content_type_id):
         """ cached version of self.content_type.model_class() """
-        ct = ContentType.objects.get(id=content_type_id)
-        return apps.get_model(ct.app_label, ct.model)
+        return resolver.model_class(content_type_id)
 
     def get_object(self):
-        """ return the object that was tested """
+        """ return the object that was tested, using the one loaded by prefetch_objects if there is one """
         model_class = self.get_model_class_from_content_type(self.content_type_id)
+        content_object = self._meta.get_field('content_object')
+        if content_object.is_cached(self):
+            obj = content_object.get_cached_value(self)
+            if obj is None:
+                raise (model_class.DoesNotExist if model_class else ObjectDoesNotExist)(
+                    'Tested object {} no longer exists'.format(self.object_id))
+            return obj
         db_alias = db_for_read(model_class)
         manager = model_class._base_manager.using(db_alias)
         return manager.get(pk=self.object_id)
 
+    @staticmethod
+    def prefetch_objects(results):
+        """ load the tested objects of results with one in_bulk query per content type, for get_object and
+        content_object. Objects that no longer exist, or whose model has been removed, are cached as None """
+        object_ids = defaultdict(set)
+        for result in results:
+            object_ids[result.content_type_id].add(result.object_id)
+        objects = {}
+        for content_type_id, ids in object_ids.items():
+            model_class = resolver.model_class(content_type_id)
+            if model_class is not None:
+                manager = model_class._base_manager.using(db_for_read(model_class))
+                objects[content_type_id] = manager.in_bulk(list(ids))
+        content_object = TestResult._meta.get_field('content_object')
+        for result in results:
+            content_object.set_cached_value(result, objects.get(result.content_type_id, {}).get(result.object_id))
+        return results
+
     @classmethod
     def get_test_results(cls, obj=None, qs=None):
         assert obj is not None or qs is not None  # Note "assert obj or qs" does not work
         ids = [obj.id] if obj else qs.values_list('id', flat=True)
         class_type = type(obj) if obj else qs.model
-        ct = ContentType.objects.get(app_label=class_type._meta.app_label, model=class_type._meta.model_name)
-        return cls.objects.filter(content_type=ct, object_id__in=ids)
+        return cls.objects.filter(content_type=resolver.content_type_for_model(class_type), object_id__in=ids)
 
-    def run_test_method(self):
+    def run_test_method(self, context=None, obj=None):
+        """ re-run the test for this object, which is fetched unless it is passed in as obj. Class method tests are
+        checked against the failing pks cached on context when one is given, otherwise with a single exists() query """
         try:
-            obj = self.get_object()
+            if obj is None:
+                obj = self.get_object()
             method = self.test_method.method()
             if self.test_method.is_class_method:
-                qs_failing, message = self.test_method.class_method_result()
-                if obj in qs_failing:
+                if context is not None:
+                    failing, message = context.is_failing(self.test_method, obj.pk)
+                else:
+                    qs_failing, message = self.test_method.class_method_result()
+                    failing = qs_failing.filter(pk=obj.pk).exists()
+                if failing:
                     method_result = False, message
                 else:
                     method_result = True
+            elif self.test_method.is_batch_method():
+                missing = False, '{} Object no longer exists.'.format(TEST_ERROR_PREFIX)
+                method_result = self.test_method.run_batch([obj.pk]).get(obj.pk, missing)
             else:
                 method_result = method(obj)
         except Exception as e:
-            method_result = False, "Test failed to run correctly! {}".format(str(e))
-
-        if type(method_result) is bool:
-            self.passed = method_result
-            self.message = ''
-        else:
-            passed, message = method_result
-            self.passed = passed
-            self.message = message[0:MAX_MESSAGE_LENGTH] if message else ''
+            method_result = False, '{} {}'.format(TEST_ERROR_PREFIX, str(e))
 
-        self.save()
+        passed, message = parse_method_result(method_result)
+        if passed != self.passed or message != self.message:
+            self.passed, self.message = passed, message
+            self.save()
 
     def object_admin_url(self):
-        return reverse("admin:%s_%s_change" % (self.content_type.app_label, self.content_type.model),
-                       args=(self.object_id,))
+        ct = resolver.content_type(self.content_type_id)
+        return reverse("admin:%s_%s_change" % (ct.app_label, ct.model), args=(self.object_id,))
 
     def object_admin_hyperlink(self, text=None):
         return '<a href="%s">%s</a>' % (self.object_admin_url(), text or str(self))
 
     def test_result_admin_url(self):
-        model = self._meta.model
-        ct = ContentType.objects.get(app_label=model._meta.app_label, model=model._meta.model_name)
-        return reverse("admin:%s_%s_change" % (ct.app_label, ct.model), args=(self.id,))
+        return reverse("admin:%s_%s_change" % (self._meta.app_label, self._meta.model_name), args=(self.id,))
 
     def test_result_admin_hyperlink(self, text=None):
         return '<a href="%s">%s</a>' % (self.test_result_admin_url(), text or str(self))
 
     @classmethod
     def test_results_for_object(cls, obj):
-        model = obj._meta.model
-        ct = ContentType.objects.get(app_label=model._meta.app_label, model=model._meta.model_name)
-        TestMethod.add_test_methods_for_content_type(ct)
-        missing_test_methods = TestMethod.objects.filter(content_type=ct).exclude(
-            id__in=cls.objects.filter(content_type=ct,
-                                      object_id=obj.pk).values_list(
-                'test_method_id', flat=True))
-        for test_method in missing_test_methods:
-            cls.objects.create(content_type=ct, object_id=obj.pk, test_method=test_method)
-        return cls.objects.filter(content_type=ct, object_id=obj.pk)
-
-    @classmethod
-    def rerun_tests_for_object(cls, obj):
-        for test_result in cls.test_results_for_object(obj):
-            test_result.run_test_method()
+        ct = resolver.content_type_for_model(obj._meta.model)
+        # The test methods are read anyway, so only sync them with the registry when they differ from it
+        from data_tests.registry import sync_test_methods
+        test_methods = list(TestMethod.objects.filter(content_type=ct))
+        if sync_test_methods([ct], existing=test_methods):
+            test_methods = list(TestMethod.objects.filter(content_type=ct))
+        results = cls.objects.filter(content_type=ct, object_id=obj.pk)
+        tested = set(results.values_list('test_method_id', flat=True))
+        to_insert = [cls(content_type=ct, object_id=obj.pk, test_method=test_method)
+                     for test_method in test_methods if test_method.pk not in tested]
+        cls.insert_new(to_insert)
+        return results
+
+    @classmethod
+    def insert_new(cls, results):
+        """ bulk insert results, new TestResults, skipping those that already exist (e.g. created meanwhile by an
+        admin save or a concurrent run), and add the ones inserted to their test methods' summaries. Returns the
+        number inserted """
+        if not results:
+            return 0
+        # bulk_create doesn't say which rows ignore_conflicts skipped, so the inserted rows are read back by their
+        # shared creation time
+        now = timezone.now()
+        for result in results:
+            result.created = result.modified = now
+        cls.objects.bulk_create(results, ignore_conflicts=True)
+        inserted = cls.objects.filter(
+            created=now,
+            test_method_id__in={result.test_method_id for result in results},
+            content_type_id__in={result.content_type_id for result in results},
+            object_id__in={result.object_id for result in results},
+        ).order_by().values('test_method').annotate(count=Count('pk'))
+        created = 0
+        for row in inserted:
+            # New results start out failing
+            TestMethodSummary.apply(row['test_method'], {'failed': row['count']})
+            created += row['count']
+        return created
+
+    @classmethod
+    def rerun_tests_for_object(cls, obj, context=None):
+        for test_result in cls.test_results_for_object(obj).select_related('test_method'):
+            test_result.run_test_method(context=context, obj=obj)
+
+    @classmethod
+    def rerun_tests_for_objects(cls, objs):
+        """ re-run tests for several objects, evaluating each class method test only once """
+        context = TestRunContext()
+        for obj in objs:
+            cls.rerun_tests_for_object(obj, context=context)
+
+
+class TestMethodSummary(models.Model):
+    """ Current passed, failed, supposed to fail (xfail, counted among failed) and not run result counts of a test
+    method. Kept up to date with deltas as results are written, so reading them doesn't scan TestResult. Writes that
+    bypass TestResult.save and the runner, e.g. bulk deletes, are corrected by rebuilddatatestsummaries """
+    test_method = models.OneToOneField(TestMethod, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    passed = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    xfail = models.IntegerField(default=0, verbose_name="Supposed to fail")
+    not_run = models.IntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    COUNTS = ('passed', 'failed', 'xfail', 'not_run')
+
+    def __str__(self):
+        return str(self.test_method)
+
+    @classmethod
+    def apply(cls, test_method_id, counts):
+        """ add counts, a dict of deltas keyed on count, to a test method's summary with a single UPDATE. A missing
+        summary is built from scratch instead, which already includes the results the deltas are for """
+        changes = {name: F(name) + count for name, count in counts.items() if count}
+        if not changes:
+            return
+        if not cls.objects.filter(test_method_id=test_method_id).update(modified=timezone.now(), **changes):
+            cls.rebuild(TestMethod.objects.filter(pk=test_method_id))
+
+    @classmethod
+    def subtract_all(cls, counts_by_test_method):
+        for test_method_id, counts in counts_by_test_method.items():
+            cls.apply(test_method_id, {name: -count for name, count in counts.items()})
+
+    @classmethod
+    def counts_of(cls, results):
+        """ counts of a TestResult queryset, as {test method id: {count: value}} """
+        rows = results.order_by().values('test_method').annotate(
+            passed_count=Count('pk', filter=Q(passed=True)),
+            failed_count=Count('pk', filter=Q(passed=False)),
+            xfail_count=Count('pk', filter=Q(passed=False, xfail=True)),
+            not_run_count=Count('pk', filter=Q(passed__isnull=True)),
+        )
+        return {row['test_method']: {name: row[name + '_count'] for name in cls.COUNTS} for row in rows}
+
+    @classmethod
+    def rebuild(cls, test_methods=None):
+        """ recount the summaries of test_methods (default: all) from their results. Returns the summaries that
+        were missing or out of date """
+        if test_methods is None:
+            test_methods = TestMethod.objects.all()
+        test_method_ids = list(test_methods.values_list('pk', flat=True))
+        counts = cls.counts_of(TestResult.objects.filter(test_method_id__in=test_method_ids))
+        existing = cls.objects.in_bulk(test_method_ids)
+        repaired = []
+        for test_method_id in test_method_ids:
+            summary = cls(test_method_id=test_method_id, **counts.get(test_method_id, dict.fromkeys(cls.COUNTS, 0)))
+            current = existing.get(test_method_id)
+            if current is None or any(getattr(current, name) != getattr(summary, name) for name in cls.COUNTS):
+                repaired.append(summary)
+        with transaction.atomic(using=router.db_for_write(cls)):
+            cls.objects.filter(test_method_id__in=[summary.test_method_id for summary in repaired]).delete()
+            cls.objects.bulk_create(repaired, ignore_conflicts=True)
+        return repaired
+
+
+class TestRun(models.Model):
+    """ A run of rundatatests, see TestMethodRun for the results of each test method """
+    started = models.DateTimeField(default=timezone.now)
+    finished = models.DateTimeField(blank=True, null=True)
+    duration = models.DurationField(blank=True, null=True)
+
+    class Meta:
+        ordering = ('-started',)
+
+    def __str__(self):
+        return 'Test run {}'.format(self.started)
+
+    def finish(self, reports):
+        """ record a TestMethodRun for each TestMethodReport and mark the run as finished """
+        TestMethodRun.objects.bulk_create([TestMethodRun.from_report(self, report) for report in reports])
+        self.finished = timezone.now()
+        self.duration = self.finished - self.started
+        self.save(update_fields=['finished', 'duration'])
+
+
+class TestMethodRun(models.Model):
+    test_run = models.ForeignKey(TestRun, on_delete=models.CASCADE, related_name='test_method_runs')
+    test_method = models.ForeignKey(TestMethod, on_delete=models.CASCADE, related_name='runs')
+    started = models.DateTimeField()
+    finished = models.DateTimeField(blank=True, null=True)
+    duration = models.DurationField(blank=True, null=True)
+    objects_tested = models.PositiveIntegerField(default=0)
+    results_updated = models.PositiveIntegerField(default=0)
+    passed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    xfail = models.PositiveIntegerField(default=0, verbose_name="Supposed to fail")
+    not_run = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0, help_text='Results not re-tested, as their inputs were unchanged')
+    newly_failing = models.PositiveIntegerField(default=0)
+    newly_passing = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return '{} {}'.format(self.test_method, self.started)
+
+    @classmethod
+    def from_report(cls, test_run, report):
+        return cls(
+            test_run=test_run,
+            test_method_id=report.test_method_id,
+            started=report.started,
+            finished=report.finished,
+            duration=report.finished - report.started if report.finished else None,
+            objects_tested=report.tested,
+            results_updated=report.updated,
+            passed=report.passed,
+            failed=report.failed,
+            xfail=report.xfail,
+            not_run=report.not_run,
+            skipped=report.skipped,
+            newly_failing=report.newly_failing_count,
+            newly_passing=report.newly_passing_count,
+            error=report.error or '',
+        )
+
+
+class DirtyObject(models.Model):
+    """ Queue of objects saved or deleted since they were last tested, see data_tests.signals. An object is only
+    queued once while unclaimed (claim=0). A drain claims rows by setting claim to a random token, so an object
+    saved again while its row is being processed is queued afresh rather than lost. Claims older than
+    settings.DATA_TESTS_CLAIM_TIMEOUT seconds are left by a drain that died, and are claimed again """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    object_id = models.PositiveIntegerField()
+    claim = models.PositiveIntegerField(default=0, db_index=True)
+    claimed = models.DateTimeField(blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('content_type', 'object_id', 'claim')
+
+    def __str__(self):
+        return '{} {}'.format(self.content_type, self.object_id)
+
+    @classmethod
+    def enqueue(cls, content_type_id, object_ids):
+        cls.objects.bulk_create([cls(content_type_id=content_type_id, object_id=object_id)
+                                 for object_id in object_ids], ignore_conflicts=True)
+
+    @classmethod
+    def claim_batch(cls, chunk_size=None):
+        """ claim up to chunk_size queued rows, returning the claim token or None once the queue is empty. Rows
+        claimed concurrently by another drain are skipped, so no row is processed twice, unless their claim has
+        expired """
+        timeout = getattr(settings, 'DATA_TESTS_CLAIM_TIMEOUT', DEFAULT_CLAIM_TIMEOUT)
+        while True:
+            now = timezone.now()
+            claimable = Q(claim=0) | Q(claimed__lt=now - timedelta(seconds=timeout))
+            ids = list(cls.objects.filter(claimable).order_by('content_type_id', 'pk').values_list(
+                'pk', flat=True)[:get_chunk_size(chunk_size)])
+            if not ids:
+                return None
+            claim = random.randint(1, MAX_CLAIM)
+            if cls.objects.filter(claimable, pk__in=ids).update(claim=claim, claimed=now):
+                return claim
+
+    @classmethod
+    def release(cls, claim):
+        """ put the rows claimed with claim back in the queue, dropping those whose object has been queued again
+        since """
+        claimed = cls.objects.filter(claim=claim)
+        claimed.filter(Exists(cls.objects.filter(content_type_id=OuterRef('content_type_id'),
+                                                 object_id=OuterRef('object_id'), claim=0))).delete()
+        claimed.update(claim=0, claimed=None)
+
+    @classmethod
+    def drain(cls, chunk_size=None, profile=False):
+        """ re-test every queued object, a batch at a time grouped by content type. Returns the merged reports """
+        reports = []
+        while True:
+            claim = cls.claim_batch(chunk_size)
+            if claim is None:
+                return TestMethodReport.merge_all(reports)
+            claimed = cls.objects.filter(claim=claim)
+            object_ids = defaultdict(list)
+            for content_type_id, object_id in claimed.values_list('content_type_id', 'object_id'):
+                object_ids[content_type_id].append(object_id)
+            try:
+                for content_type_id, ids in object_ids.items():
+                    reports.extend(TestMethod.rerun_tests_for_object_ids(
+                        content_type_id, ids, chunk_size=chunk_size, profile=profile))
+            except BaseException:
+                # Leave the objects for the next drain rather than claimed until the claim expires
+                cls.release(claim)
+                raise
+            claimed.delete()
@@ -0,0 +1,42 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import logging
+import traceback
+
+import django
+from django.db import connections
+
+from data_tests.models import TestMethod
+from data_tests.reports import TestMethodReport
+
+logger = logging.getLogger(__name__)
+
+
+def _setup_worker():
+    # Workers started with the spawn method have to set django up themselves. Forked workers are already set up
+    # and open their own database connections on first use, as the parent closes its connections before forking
+    django.setup()
+
+
+def _run_test_method(test_method_id, pk_range, run_options):
+    return TestMethod.objects.get(pk=test_method_id).try_run_test_method(pk_range=pk_range, **run_options)
+
+
+def run_test_methods_in_parallel(tasks, workers, **run_options):
+    """ run each (test method, pk range) task in a pool of worker processes, each with its own database
+    connection. Returns a TestMethodReport per task; a task that raises is reported with its traceback in
+    report.error rather than aborting the run """
+    connections.close_all()
+    reports = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as executor:
+        futures = {executor.submit(_run_test_method, test_method.pk, pk_range, run_options): test_method
+                   for test_method, pk_range in tasks}
+        for future in as_completed(futures):
+            try:
+                report = future.result()
+            except Exception:
+                # The worker process itself died, e.g. it was killed or the pool broke
+                report = TestMethodReport(futures[future])
+                report.error = traceback.format_exc()
+            reports.append(report)
+            logger.info('Completed {}/{}: {}'.format(len(reports), len(tasks), report))
+    return reports
@@ -0,0 +1,108 @@
+from array import array
+from contextlib import contextmanager, ExitStack
+import heapq
+import json
+import time
+
+from django.db import connections
+
+from data_tests.constants import PROFILE_SLOWEST_OBJECTS
+
+
+class TestMethodProfile(object):
+    """ Wall time, database queries and per-object latencies of running a single test method """
+
+    def __init__(self):
+        self.wall_time = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+        self.object_times = array('d')
+        # min-heap of (seconds, object id), so the fastest of the slowest objects is the one replaced
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """ connection.execute_wrapper hook counting and timing every query """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_time += time.perf_counter() - start
+
+    @contextmanager
+    def capture(self):
+        """ time the block and every query it runs, on every database connection """
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            try:
+                yield self
+            finally:
+                self.wall_time += time.perf_counter() - start
+
+    def record_object(self, object_id, seconds):
+        self.object_times.append(seconds)
+        self.record_slowest(seconds, object_id)
+
+    def merge(self, other):
+        self.wall_time += other.wall_time
+        self.query_count += other.query_count
+        self.query_time += other.query_time
+        self.object_times.extend(other.object_times)
+        for seconds, object_id in other.slowest:
+            self.record_slowest(seconds, object_id)
+
+    def record_slowest(self, seconds, object_id):
+        if len(self.slowest) < PROFILE_SLOWEST_OBJECTS:
+            heapq.heappush(self.slowest, (seconds, object_id))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, object_id))
+
+    def as_dict(self):
+        ordered = sorted(self.object_times)
+        return {
+            'wall_time': self.wall_time,
+            'query_count': self.query_count,
+            'query_time': self.query_time,
+            'objects_timed': len(ordered),
+            'p50': _percentile(ordered, 50),
+            'p95': _percentile(ordered, 95),
+            'p99': _percentile(ordered, 99),
+            'slowest_objects': [{'object_id': object_id, 'seconds': seconds}
+                                for seconds, object_id in sorted(self.slowest, reverse=True)],
+        }
+
+
+def _percentile(ordered, percent):
+    """ value at the given percentile of a sorted list, or None for tests with no per-object timings """
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100.0))]
+
+
+def _ms(seconds):
+    return '-' if seconds is None else '{:.1f}'.format(seconds * 1000)
+
+
+def profile_lines(reports):
+    """ lines of a text report of the profiled test methods, slowest first """
+    profiled = sorted((report for report in reports if report.profile),
+                      key=lambda report: report.profile.wall_time, reverse=True)
+    lines = ['{:<40} {:>10} {:>8} {:>10} {:>8} {:>8} {:>8}  {}'.format(
+        'Test', 'Wall (s)', 'Queries', 'Query (s)', 'p50 ms', 'p95 ms', 'p99 ms', 'Slowest objects')]
+    for report in profiled:
+        profile = report.profile.as_dict()
+        lines.append('{:<40} {:>10.2f} {:>8} {:>10.2f} {:>8} {:>8} {:>8}  {}'.format(
+            report.title[:40], profile['wall_time'], profile['query_count'], profile['query_time'],
+            _ms(profile['p50']), _ms(profile['p95']), _ms(profile['p99']),
+            ', '.join(str(slow['object_id']) for slow in profile['slowest_objects'])))
+    return lines
+
+
+def write_profile_json(reports, path):
+    data = [dict(report.profile.as_dict(), test_method_id=report.test_method_id, title=report.title)
+            for report in reports if report.profile]
+    data.sort(key=lambda profile: profile['wall_time'], reverse=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
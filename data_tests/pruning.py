@@ -0,0 +1,103 @@
+import logging
+
+from django.db import router
+from django.db.models import Exists, OuterRef
+
+from data_tests import resolver
+from data_tests.models import TestMethod, TestMethodSummary, TestResult, db_for_read, get_chunk_size
+from data_tests.registry import discover_test_methods
+
+logger = logging.getLogger(__name__)
+
+
+def delete_results(pks, update_summaries=True):
+    """ delete the results with pks in a single DELETE, taking them off their test methods' summaries """
+    results = TestResult.objects.filter(pk__in=pks)
+    counts = TestMethodSummary.counts_of(results) if update_summaries else {}
+    deleted, _ = results.delete()
+    TestMethodSummary.subtract_all(counts)
+    return deleted
+
+
+def delete_in_batches(results, chunk_size=None, update_summaries=True):
+    """ delete the results of a TestResult queryset chunk_size at a time, each batch in its own short DELETE by pk,
+    so that pruning a huge table never holds its locks for long. Returns the number deleted """
+    chunk_size = get_chunk_size(chunk_size)
+    results = results.order_by('pk').values_list('pk', flat=True)
+    deleted = 0
+    last_pk = None
+    while True:
+        batch = list((results if last_pk is None else results.filter(pk__gt=last_pk))[:chunk_size])
+        if not batch:
+            return deleted
+        last_pk = batch[-1]
+        deleted += delete_results(batch, update_summaries)
+
+
+def orphaned_result_ids(content_type_id, chunk_size=None, exclude_test_methods=()):
+    """ yield lists of the pks of results of content_type_id whose object no longer exists, up to chunk_size at a
+    time, leaving out the results of exclude_test_methods (pks). An anti-join in the database when the tested model
+    is in the same database as TestResult, else each chunk of results is checked against the model's table """
+    chunk_size = get_chunk_size(chunk_size)
+    model_class = resolver.model_class(content_type_id)
+    results = TestResult.objects.filter(content_type_id=content_type_id).exclude(
+        test_method_id__in=exclude_test_methods).order_by('pk')
+    if model_class is None:
+        objects = None
+    else:
+        objects = model_class._base_manager.using(db_for_read(model_class))
+    same_database = objects is not None and objects.db == router.db_for_write(TestResult)
+    if same_database:
+        results = results.filter(~Exists(objects.filter(pk=OuterRef('object_id'))))
+    last_pk = None
+    while True:
+        chunk = results if last_pk is None else results.filter(pk__gt=last_pk)
+        if same_database:
+            orphans = list(chunk.values_list('pk', flat=True)[:chunk_size])
+            if not orphans:
+                return
+            last_pk = orphans[-1]
+        else:
+            chunk = list(chunk.values_list('pk', 'object_id')[:chunk_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1][0]
+            existing = set() if objects is None else set(objects.filter(
+                pk__in=[object_id for pk, object_id in chunk]).values_list('pk', flat=True))
+            orphans = [pk for pk, object_id in chunk if object_id not in existing]
+        if orphans:
+            yield orphans
+
+
+def unregistered_test_methods():
+    """ TestMethod rows whose test is no longer defined on its model, or whose model no longer exists """
+    registered = {(resolver.content_type_for_model(model).pk, method_name)
+                  for model, methods in discover_test_methods().items() for method_name in methods}
+    return [test_method for test_method in TestMethod.objects.all()
+            if (test_method.content_type_id, test_method.method_name) not in registered]
+
+
+def prune(chunk_size=None, dry_run=False):
+    """ delete the TestMethods of tests that no longer exist, with all their results, and the results of objects
+    that have been deleted. Returns (test methods deleted, results deleted); with dry_run, nothing is deleted and
+    the counts are of what would be """
+    test_methods = unregistered_test_methods()
+    # Taken before deleting, which clears their pks
+    dropped = [test_method.pk for test_method in test_methods]
+    results_deleted = 0
+    for test_method in test_methods:
+        logger.info('Deleting test method {} which is no longer defined'.format(test_method))
+        if dry_run:
+            results_deleted += test_method.test_results.count()
+        else:
+            # Its summary goes with the test method
+            results_deleted += delete_in_batches(test_method.test_results.all(), chunk_size, update_summaries=False)
+            test_method.delete()
+
+    content_type_ids = set(TestMethod.objects.exclude(pk__in=dropped).values_list('content_type_id', flat=True))
+    for content_type_id in sorted(content_type_ids):
+        # With dry_run the results of dropped test methods are still there, and were counted above
+        for orphans in orphaned_result_ids(content_type_id, chunk_size, exclude_test_methods=dropped):
+            results_deleted += len(orphans) if dry_run else delete_results(orphans)
+    logger.info('Deleted {} test methods and {} test results'.format(len(test_methods), results_deleted))
+    return len(test_methods), results_deleted
@@ -1,44 +1,144 @@
 from collections import defaultdict
-import inspect
 
 from django.apps import apps
-from django.contrib.contenttypes.models import ContentType
+from django.db import models
 
+from data_tests import resolver
 from data_tests.models import TestMethod
 
 registry = defaultdict(dict)
+# {model: {method name: TestMethod field values}}, filled once per process by discover_test_methods
+_discovered = None
+
+
+def _test_methods_of(model):
+    """ data tests defined on model or its (non django) base classes. Only the class dicts are scanned, rather than
+    every attribute of the model as inspect.getmembers would, which also evaluates managers and descriptors. As with
+    getattr, the most derived definition of a name wins, so a test overridden by a plain method is not a test """
+    attributes = {}
+    for klass in reversed(model.__mro__):
+        if klass in models.Model.__mro__:
+            continue
+        attributes.update(vars(klass))
+    methods = {}
+    for attribute in attributes.values():
+        # classmethods and staticmethods keep the decorated function in __func__
+        method = getattr(attribute, '__func__', attribute)
+        if getattr(method, 'is_data_test', False):
+            methods[method.__name__] = {
+                'title': method.model_test_title or method.__name__.replace('_', ' ').capitalize(),
+                'is_class_method': method.is_class_method
+            }
+    return methods
+
+
+def discover_test_methods():
+    """ data tests of every installed model, found once per process without touching the database. Proxy models
+    are skipped: the tests they inherit are run once, for their concrete model """
+    global _discovered
+    if _discovered is None:
+        discovered = {}
+        for model in apps.get_models():
+            if model._meta.proxy:
+                continue
+            methods = _test_methods_of(model)
+            if methods:
+                discovered[model] = methods
+        _discovered = discovered
+    return _discovered
+
 
 def load_test_methods():
-    for model in apps.get_models():
-        content_type = ContentType.objects.get_for_model(model)
-        for name, method in inspect.getmembers(model):
-            if getattr(method, 'is_data_test', False):
-                registry[content_type][method.__name__] = {
-                    'title': method.model_test_title or
-                             method.__name__.replace('_', ' ').capitalize(),
-                    'is_class_method': method.is_class_method
-                }
+    loaded = {resolver.content_type_for_model(model): methods for model, methods in discover_test_methods().items()}
+    # Content types resolved before the resolver's caches were last cleared may have been deleted since
+    registry.clear()
+    registry.update(loaded)
+
+
+def models_with_data_tests():
+    """ installed models with at least one data test, found without touching the database """
+    return list(discover_test_methods())
+
+
+def sync_test_methods(content_types=None, existing=None):
+    """ bring the TestMethod rows of content_types (default: every content type with data tests) in line with the
+    registry, with one read of the existing rows (skipped when they are passed in as existing) and a bulk insert
+    and bulk update of only the test methods that are new or changed. Returns whether anything was written """
+    load_test_methods()
+    if content_types is None:
+        content_types = list(registry)
+    if existing is None:
+        existing = TestMethod.objects.filter(content_type__in=content_types)
+    existing = {(test_method.content_type_id, test_method.method_name): test_method for test_method in existing}
+
+    to_create, to_update = [], []
+    for content_type in content_types:
+        for method_name, defaults in registry.get(content_type, {}).items():
+            test_method = existing.get((content_type.pk, method_name))
+            if test_method is None:
+                to_create.append(TestMethod(content_type=content_type, method_name=method_name, **defaults))
+            elif any(getattr(test_method, field) != value for field, value in defaults.items()):
+                for field, value in defaults.items():
+                    setattr(test_method, field, value)
+                to_update.append(test_method)
+    if to_create:
+        # Another process may be syncing the same test methods
+        TestMethod.objects.bulk_create(to_create, ignore_conflicts=True)
+    if to_update:
+        TestMethod.objects.bulk_update(to_update, ['title', 'is_class_method'])
+    return bool(to_create or to_update)
 
 
 def add_test_methods_to_database():
-    for content_type, method_dict in registry.items():
-        for method_name, defaults in method_dict.items():
-            TestMethod.objects.update_or_create(
-                content_type=content_type,
-                method_name=method_name,
-                defaults=defaults
-            )
+    sync_test_methods()
 
 # Used as a decorator
-def test_method(title=None, is_class_method=False):
+def test_method(title=None, is_class_method=False, change_field=None, timeout=None, budget=None,
+                select_related=None, prefetch_related=None, only=None, defer=None, inputs=None, version=None):
+    """ change_field names a DateTimeField on the model (e.g. 'modified') that is updated whenever an object
+    changes. Incremental runs (rundatatests --incremental) only re-test objects where it is newer than the last run.
+
+    An instance test that takes longer than timeout seconds on an object leaves that object's result "not run" rather
+    than failed. Once it has run for budget seconds in total, the rest of its results are left "not run" too.
+
+    select_related, prefetch_related, only and defer are lists of fields passed to the queryset methods of the same
+    name when rundatatests loads a chunk of objects to test, so that a test reading related objects doesn't make a
+    query per object and one reading a few fields of a wide model doesn't load the rest.
+
+    inputs lists the fields of the model the test depends on. Results are stored with a fingerprint of their
+    object's inputs and the test's version (a hash of its source unless given), and objects whose fingerprint hasn't
+    changed are not re-tested. A class method test is only re-run once the inputs of any object have changed """
     def test_method_inner(method):
         method.is_data_test = True
         method.is_class_method = is_class_method
         method.model_test_title = title
+        method.change_field = change_field
+        method.timeout = timeout
+        method.budget = budget
+        method.fetch_hints = {name: tuple(fields) for name, fields in (
+            ('select_related', select_related), ('prefetch_related', prefetch_related), ('only', only),
+            ('defer', defer)) if fields}
+        method.inputs = tuple(inputs or ())
+        method.version = version
         return method
 
     return test_method_inner
 
 
-def test_class_method(title=None):
-    return test_method(title, is_class_method=True)
+def test_class_method(title=None, change_field=None, inputs=None, version=None):
+    return test_method(title, is_class_method=True, change_field=change_field, inputs=inputs, version=version)
+
+
+def test_batch_method(title=None, values=None, change_field=None, budget=None, **options):
+    """ a test run against a chunk of objects at a time, for checks that are faster done over many objects at once
+    (e.g. with set operations or numpy). The decorated classmethod is passed a list of the chunk's objects, or of
+    dicts of their pk and the fields in values, and returns {pk: result} where each result is anything an instance
+    test can return. Objects left out of the mapping pass. The inputs, version and (without values) fetch hints
+    of test_method apply """
+    def test_batch_method_inner(method):
+        test_method(title, change_field=change_field, budget=budget, **options)(method)
+        method.is_batch_method = True
+        method.batch_values = tuple(values or ())
+        return method
+
+    return test_batch_method_inner
@@ -0,0 +1,125 @@
+from django.utils import timezone
+
+from data_tests.constants import MAX_REPORTED_OBJECTS
+
+
+class TestMethodReport(object):
+    """ Summary of the test results that changed while running a single test method """
+
+    def __init__(self, test_method):
+        self.test_method_id = test_method.pk
+        self.title = str(test_method)
+        self.started = timezone.now()
+        self.finished = None
+        self.tested = 0
+        self.updated = 0
+        self.passed = 0
+        self.failed = 0
+        self.xfail = 0
+        self.not_run = 0
+        # Results not re-tested because the fingerprint of their inputs was unchanged, see registry.test_method
+        self.skipped = 0
+        self.budget_exceeded = False
+        self.error = None
+        self.newly_failing_count = 0
+        self.newly_passing_count = 0
+        # Only the first MAX_REPORTED_OBJECTS object ids are kept, so that a first run over a huge table
+        # doesn't hold every object id in memory
+        self.newly_failing = []
+        self.newly_passing = []
+        # Objects that ran past the per-object timeout, and those of them that had also timed out in the previous run
+        self.timed_out_count = 0
+        self.timed_out = []
+        self.repeat_timeouts = []
+        # TestMethodProfile, when the test method was run with profiling
+        self.profile = None
+
+    def __str__(self):
+        if self.error:
+            return '{}: error running test'.format(self.title)
+        description = '{}: {} newly failing, {} newly passing, {} results updated'.format(
+            self.title, self.newly_failing_count, self.newly_passing_count, self.updated)
+        if self.not_run:
+            description += ', {} not run{}'.format(self.not_run, ' (budget exceeded)' if self.budget_exceeded else '')
+        if self.skipped:
+            description += ', {} unchanged'.format(self.skipped)
+        return description
+
+    @property
+    def has_changes(self):
+        return bool(self.newly_failing_count or self.newly_passing_count)
+
+    def set_counts(self, passed, failed, xfail):
+        self.passed, self.failed, self.xfail = passed, failed, xfail
+
+    def add_newly_failing(self, object_ids):
+        self.newly_failing_count += self._extend(self.newly_failing, object_ids)
+
+    def add_newly_passing(self, object_ids):
+        self.newly_passing_count += self._extend(self.newly_passing, object_ids)
+
+    def add_timed_out(self, object_id, repeated=False):
+        self.timed_out_count += self._extend(self.timed_out, [object_id])
+        if repeated:
+            self._extend(self.repeat_timeouts, [object_id])
+
+    def record(self, object_id, passed, previously_passed=None):
+        """ record a written result. previously_passed is None for results created during this run. Results that
+        were not run (passed is None) are neither newly failing nor newly passing """
+        self.updated += 1
+        if passed is None:
+            return
+        if previously_passed is None or bool(passed) != previously_passed:
+            if passed:
+                self.add_newly_passing([object_id])
+            else:
+                self.add_newly_failing([object_id])
+
+    def merge(self, other):
+        """ fold the report of another shard of the same test method into this one """
+        self.started = min(self.started, other.started)
+        if self.finished and other.finished:
+            self.finished = max(self.finished, other.finished)
+        self.tested += other.tested
+        self.updated += other.updated
+        self.passed += other.passed
+        self.failed += other.failed
+        self.xfail += other.xfail
+        self.not_run += other.not_run
+        self.skipped += other.skipped
+        self.budget_exceeded = self.budget_exceeded or other.budget_exceeded
+        self.add_newly_failing(other.newly_failing)
+        self.add_newly_passing(other.newly_passing)
+        # add_newly_* counted the reported ids, correct that to the other shard's full counts
+        self.newly_failing_count += other.newly_failing_count - len(other.newly_failing)
+        self.newly_passing_count += other.newly_passing_count - len(other.newly_passing)
+        self.timed_out_count += other.timed_out_count
+        self._extend(self.timed_out, other.timed_out)
+        self._extend(self.repeat_timeouts, other.repeat_timeouts)
+        if other.error:
+            self.error = '\n'.join(error for error in (self.error, other.error) if error)
+        if other.profile:
+            if self.profile:
+                self.profile.merge(other.profile)
+            else:
+                self.profile = other.profile
+
+    @classmethod
+    def merge_all(cls, reports):
+        """ merge reports for shards of the same test method, keeping the order test methods were first seen """
+        merged = {}
+        for report in reports:
+            if report.test_method_id in merged:
+                merged[report.test_method_id].merge(report)
+            else:
+                merged[report.test_method_id] = report
+        return list(merged.values())
+
+    @staticmethod
+    def _extend(object_id_list, object_ids):
+        count = 0
+        for object_id in object_ids:
+            if len(object_id_list) < MAX_REPORTED_OBJECTS:
+                object_id_list.append(object_id)
+            count += 1
+        return count
@@ -0,0 +1,43 @@
+""" Process wide caches of the metadata needed to run tests: content types, model classes and test callables.
+After warm-up, running tests for an object needs no queries to look these up """
+from functools import lru_cache
+
+from django.contrib.contenttypes.models import ContentType
+
+from data_tests.constants import RESOLVER_CACHE_SIZE
+
+
+@lru_cache(maxsize=RESOLVER_CACHE_SIZE)
+def content_type_for_model(model):
+    """ content type of model. Proxy models share the content type of their concrete model, as tests and their
+    results belong to the concrete model """
+    return ContentType.objects.get_for_model(model)
+
+
+@lru_cache(maxsize=RESOLVER_CACHE_SIZE)
+def content_type(content_type_id):
+    return ContentType.objects.get_for_id(content_type_id)
+
+
+@lru_cache(maxsize=RESOLVER_CACHE_SIZE)
+def model_class(content_type_id):
+    """ model class of a content type, or None for content types of models that have been removed """
+    return content_type(content_type_id).model_class()
+
+
+@lru_cache(maxsize=RESOLVER_CACHE_SIZE)
+def _test_callable(test_method_id, content_type_id, method_name):
+    return getattr(model_class(content_type_id), method_name)
+
+
+def test_callable(test_method):
+    """ the method of test_method's model that it runs. Class tests are bound to the model class """
+    return _test_callable(test_method.pk, test_method.content_type_id, test_method.method_name)
+
+
+def clear_caches(**kwargs):
+    """ forget everything resolved so far, e.g. once content types have been created or deleted by a migration or
+    a test database has been flushed. Connected to post_migrate """
+    for cached in (content_type_for_model, content_type, model_class, _test_callable):
+        cached.cache_clear()
+    ContentType.objects.clear_cache()
@@ -0,0 +1,93 @@
+from collections import Counter, defaultdict
+import heapq
+import json
+
+from django.db import DatabaseError, connections
+
+from data_tests.constants import DEFAULT_OBJECT_COST, SCHEDULE_HISTORY_RUNS
+from data_tests.models import TestMethodRun, db_for_read
+
+
+class TaskEstimate(object):
+    """ Estimated cost in seconds of running a test method, or one pk range of it """
+
+    def __init__(self, test_method, pk_range, seconds, rows, source):
+        self.test_method = test_method
+        self.pk_range = pk_range
+        self.seconds = seconds
+        self.rows = rows
+        # 'history' when the cost per object is from recent runs, 'default' when it is DEFAULT_OBJECT_COST
+        self.source = source
+
+
+def recent_runs(test_methods):
+    """ {test method id: [(duration in seconds, objects tested)]} of the last SCHEDULE_HISTORY_RUNS runs of each
+    test method that finished without an error """
+    runs = defaultdict(list)
+    history = TestMethodRun.objects.filter(
+        test_method__in=test_methods, duration__isnull=False, error='').order_by('-started').values_list(
+        'test_method_id', 'duration', 'objects_tested')
+    for test_method_id, duration, objects_tested in history.iterator():
+        if len(runs[test_method_id]) < SCHEDULE_HISTORY_RUNS:
+            runs[test_method_id].append((duration.total_seconds(), objects_tested))
+    return runs
+
+
+def estimated_row_count(model):
+    """ the database's estimate of the number of rows of model from EXPLAIN, where the backend gives one, or
+    else an exact count """
+    objects = model._base_manager.using(db_for_read(model))
+    vendor = connections[objects.db].vendor
+    try:
+        if vendor == 'postgresql':
+            return int(json.loads(objects.explain(format='json'))[0]['Plan']['Plan Rows']), 'explain'
+        if vendor == 'mysql':
+            return int(json.loads(objects.explain(format='json'))['query_block']['table']['rows_examined_per_scan']), \
+                'explain'
+    except (DatabaseError, KeyError, IndexError, TypeError, ValueError):
+        pass
+    return objects.count(), 'count'
+
+
+def estimate_tasks(tasks):
+    """ a TaskEstimate for each (test method, pk range) task: the number of objects of its model times the seconds
+    per object tested in its recent runs, or DEFAULT_OBJECT_COST when it has none, split evenly over its pk ranges.
+    Costing per object keeps incremental runs, and runs that skipped unchanged objects, from making a full run
+    look cheap """
+    test_methods = {test_method.pk: test_method for test_method, pk_range in tasks}
+    runs = recent_runs(list(test_methods))
+    shards = Counter(test_method.pk for test_method, pk_range in tasks)
+    row_counts = {}
+    estimates = []
+    for test_method, pk_range in tasks:
+        model_class = test_method.model_class()
+        if model_class not in row_counts:
+            # The model of a test method left behind by a removed app has nothing to test
+            row_counts[model_class] = estimated_row_count(model_class) if model_class else (0, 'count')
+        rows, _ = row_counts[model_class]
+        # Runs that tested nothing (e.g. every object was unchanged) say nothing about the cost of an object
+        history = [(duration, objects_tested) for duration, objects_tested in runs.get(test_method.pk, [])
+                   if objects_tested]
+        if history:
+            object_cost = sum(duration for duration, _ in history) / sum(tested for _, tested in history)
+            source = 'history'
+        else:
+            object_cost = DEFAULT_OBJECT_COST
+            source = 'default'
+        estimates.append(TaskEstimate(test_method, pk_range, rows * object_cost / shards[test_method.pk],
+                                      rows // shards[test_method.pk], source))
+    return estimates
+
+
+def schedule(estimates):
+    """ estimates ordered longest first. Handing tasks to whichever worker is free next in this order
+    (longest processing time first) keeps a long task that starts last from stretching the run """
+    return sorted(estimates, key=lambda estimate: estimate.seconds, reverse=True)
+
+
+def makespan(estimates, workers):
+    """ predicted wall time of running the scheduled estimates on workers, each taking the next task when free """
+    finish_times = [0.0] * max(workers, 1)
+    for estimate in estimates:
+        heapq.heapreplace(finish_times, finish_times[0] + estimate.seconds)
+    return max(finish_times)
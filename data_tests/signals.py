@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from data_tests import resolver
+from data_tests.registry import models_with_data_tests
+
+
+def queue_dirty_object(sender, instance, using, **kwargs):
+    """ queue instance to be re-tested by rundatatests --drain-queue, once the write that changed it commits """
+    from data_tests.models import DirtyObject
+    content_type_id = resolver.content_type_for_model(sender).pk
+    # Read the pk now, as it is cleared on the instance once it has been deleted
+    object_id = instance.pk
+    transaction.on_commit(lambda: DirtyObject.enqueue(content_type_id, [object_id]), using=using)
+
+
+def queued_models():
+    """ models whose saves and deletes are queued, according to settings.DATA_TESTS_QUEUE_DIRTY_OBJECTS which is
+    either True for every model with data tests or a list of 'app_label.ModelName' labels """
+    setting = getattr(settings, 'DATA_TESTS_QUEUE_DIRTY_OBJECTS', False)
+    if not setting:
+        return []
+    models = models_with_data_tests()
+    if setting is True:
+        return models
+    labels = {label.lower() for label in setting}
+    return [model for model in models if model._meta.label_lower in labels]
+
+
+def connect_dirty_object_handlers():
+    for model in queued_models():
+        post_save.connect(queue_dirty_object, sender=model, dispatch_uid='data_tests_queue_save')
+        post_delete.connect(queue_dirty_object, sender=model, dispatch_uid='data_tests_queue_delete')
@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+import signal
+import threading
+
+
+class ObjectTimeout(Exception):
+    """ Raised inside a test that runs past its per-object timeout """
+
+
+def can_interrupt():
+    """ whether time_limit can interrupt a running test: SIGALRM is only available on unix, and only delivered to
+    the main thread """
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+
+@contextmanager
+def time_limit(seconds):
+    """ raise ObjectTimeout in the block if it runs for longer than seconds. Where the block can't be interrupted
+    it runs to completion, and it is up to the caller to compare how long it took """
+    if not seconds or not can_interrupt():
+        yield
+        return
+
+    def handler(signum, frame):
+        raise ObjectTimeout()
+
+    previous = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
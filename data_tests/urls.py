@@ -31,5 +31,20 @@ urlpatterns = [
         regex="^TestResult/$",
         view=views.TestResultListView.as_view(),
         name='TestResult_list',
+    ),
+    url(
+        regex="^api/TestResult/$",
+        view=views.TestResultAPIView.as_view(),
+        name='TestResult_api',
+    ),
+    url(
+        regex="^TestResult/~export/$",
+        view=views.TestResultExportView.as_view(),
+        name='TestResult_export',
+    ),
+    url(
+        regex="^TestMethodSummary/$",
+        view=views.TestMethodSummaryListView.as_view(),
+        name='TestMethodSummary_list',
     ),
 	]
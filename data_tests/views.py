@@ -1,14 +1,22 @@
 # -*- coding: utf-8 -*-
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
     UpdateView,
-    ListView
+    ListView,
+    View,
 )
 
+from .constants import API_PAGE_SIZE, MAX_API_PAGE_SIZE
+from .export import FORMATS, failing_results, iter_lines, iter_rows
 from .models import (
-	TestResult,
+    TestMethod,
+    TestMethodSummary,
+    TestResult,
 )
 
 
@@ -35,4 +43,94 @@ class TestResultUpdateView(UpdateView):
 class TestResultListView(ListView):
 
     model = TestResult
-
+    paginate_by = API_PAGE_SIZE
+    ordering = ('pk',)
+
+
+def _parse_bool(value, allow_null=False):
+    if value in ('true', '1'):
+        return True
+    if value in ('false', '0'):
+        return False
+    if allow_null and value == 'null':
+        return None
+    raise ValueError('expected true or false{}, not {!r}'.format(' or null' if allow_null else '', value))
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class TestResultAPIView(View):
+    """ Read-only JSON list of test results, filtered on test_method, content_type, passed (true, false or null for
+    results that were not run) and xfail. Results are returned in id order, limit at a time. Each page links to the
+    next with after=<last id>, so a page costs the same however deep into the results it is. Staff only, as test
+    messages can contain anything """
+
+    fields = ('id', 'test_method_id', 'content_type_id', 'object_id', 'passed', 'xfail', 'message', 'modified')
+
+    def get(self, request):
+        try:
+            results, after, limit = self.parse(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        if after is not None:
+            results = results.filter(pk__gt=after)
+        # One more than a page is read to find out whether there is a next page
+        page = list(results.order_by('pk').values(*self.fields)[:limit + 1])
+        next_url = None
+        if len(page) > limit:
+            page = page[:limit]
+            params = request.GET.copy()
+            params['after'] = page[-1]['id']
+            next_url = '{}?{}'.format(request.path, params.urlencode())
+        return JsonResponse({'results': page, 'next': next_url})
+
+    def parse(self, params):
+        results = TestResult.objects.all()
+        for name in ('test_method', 'content_type'):
+            if name in params:
+                results = results.filter(**{name + '_id': int(params[name])})
+        if 'passed' in params:
+            passed = _parse_bool(params['passed'], allow_null=True)
+            results = results.filter(passed__isnull=True) if passed is None else results.filter(passed=passed)
+        if 'xfail' in params:
+            results = results.filter(xfail=_parse_bool(params['xfail']))
+        after = int(params['after']) if 'after' in params else None
+        limit = int(params.get('limit', API_PAGE_SIZE))
+        if not 0 < limit <= MAX_API_PAGE_SIZE:
+            raise ValueError('limit must be between 1 and {}'.format(MAX_API_PAGE_SIZE))
+        return results, after, limit
+
+
+class TestMethodSummaryListView(ListView):
+    """ Result counts of every test method, read from TestMethodSummary rather than counted from TestResult """
+
+    model = TestMethodSummary
+    queryset = TestMethodSummary.objects.select_related('test_method').order_by('-failed', 'test_method__title')
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class TestResultExportView(View):
+    """ Failing test results streamed as csv or jsonl (format=), optionally filtered on test_method and content_type
+    ids and including failures that are supposed to fail (include_xfail=true) and the str() of each object
+    (with_objects=true). Only available to staff, as the export can include anything a test's message does """
+
+    content_types = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+    def get(self, request):
+        params = request.GET
+        try:
+            format = params.get('format', 'csv')
+            if format not in FORMATS:
+                raise ValueError('format must be one of {}'.format(', '.join(FORMATS)))
+            test_methods = TestMethod.objects.filter(pk=int(params['test_method'])) \
+                if 'test_method' in params else None
+            content_type_id = int(params['content_type']) if 'content_type' in params else None
+            include_xfail = _parse_bool(params.get('include_xfail', 'false'))
+            with_objects = _parse_bool(params.get('with_objects', 'false'))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        rows = iter_rows(failing_results(test_methods, content_type_id, include_xfail), with_objects=with_objects)
+        response = StreamingHttpResponse(iter_lines(rows, format, with_objects),
+                                         content_type=self.content_types[format])
+        response['Content-Disposition'] = 'attachment; filename="failing_test_results.{}"'.format(format)
+        return response
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.contrib import admin
+
+from data_tests.admin import DataTestsAdminMixin
+
+from tests.models import Product
+
+
+@admin.register(Product)
+class ProductAdmin(DataTestsAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'price')
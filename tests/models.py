@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.db import models
+
+from data_tests.registry import test_batch_method, test_class_method, test_method
+
+
+class Product(models.Model):
+    """ Model with one data test of each kind, used by the test suite """
+    name = models.CharField(max_length=50, blank=True)
+    price = models.IntegerField(default=1)
+    modified = models.DateTimeField(auto_now=True)
+
+    @test_method('Price is positive', change_field='modified')
+    def check_price(self):
+        if self.price <= 0:
+            return False, 'price {}'.format(self.price)
+        return True
+
+    @classmethod
+    @test_class_method('Products have names')
+    def check_names(cls):
+        return cls.objects.filter(name=''), 'no name'
+
+    @classmethod
+    @test_batch_method('Price is below 1000')
+    def check_price_batch(cls, products):
+        return {product.pk: (False, 'too expensive') for product in products if product.price >= 1000}
+
+
+class CheapProduct(Product):
+    class Meta:
+        proxy = True
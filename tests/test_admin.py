@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import threading
+from unittest import mock
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from data_tests import deferred, resolver
+from data_tests.admin import TESTS_PENDING_MESSAGE
+from data_tests.models import DirtyObject, TestMethod, TestResult
+from data_tests.registry import add_test_methods_to_database, test_class_method, test_method
+
+from tests.admin import ProductAdmin
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class AdminTestCase(SummaryTestCase):
+
+    def setUp(self):
+        super(AdminTestCase, self).setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+
+class RerunActionTests(AdminTestCase):
+
+    def test_class_method_tests_are_evaluated_once(self):
+        calls = []
+
+        @test_class_method('Products have names')
+        def check_names(cls):
+            calls.append(cls)
+            return cls.objects.filter(name=''), 'no name'
+
+        products = [Product.objects.create(name=name, price=1) for name in ('a', '', 'b', '')]
+        with mock.patch.object(Product, 'check_names', classmethod(check_names)):
+            response = self.client.post(reverse('admin:tests_product_changelist'), {
+                'action': 'rerun_data_tests', ACTION_CHECKBOX_NAME: [product.pk for product in products]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([self.result(self.check_names, product).passed for product in products],
+                         [True, False, True, False])
+        self.assertEqual(self.result(self.check_names, products[1]).message, 'no name')
+        self.assertSummariesMatchResults()
+
+
+class DeferredModeTests(TransactionTestCase):
+    """ Tests run after the save has committed, so these can't run inside a TestCase's transaction """
+
+    def setUp(self):
+        resolver.clear_caches()
+        self.addCleanup(resolver.clear_caches)
+        self.addCleanup(self.shut_down_executor)
+        add_test_methods_to_database()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.product = Product.objects.create(name='a', price=1)
+        self.url = reverse('admin:tests_product_change', args=[self.product.pk])
+
+    def shut_down_executor(self):
+        if deferred._executor is not None:
+            deferred._executor.shutdown(wait=True)
+            deferred._executor = None
+
+    def save(self, price, mode, latency_budget=None):
+        with mock.patch.multiple(ProductAdmin, data_tests_mode=mode, data_tests_latency_budget=latency_budget):
+            response = self.client.post(self.url, {'name': 'a', 'price': price, '_continue': 'Save'}, follow=True)
+        self.assertEqual(response.status_code, 200)
+        return [str(message) for message in response.context['messages']]
+
+    def view(self, mode):
+        with mock.patch.object(ProductAdmin, 'data_tests_mode', mode):
+            response = self.client.get(self.url)
+        return [str(message) for message in response.context['messages']]
+
+    def failing_report(self, messages):
+        return [message for message in messages if 'the following tests are failing' in message]
+
+    def test_sync(self):
+        messages = self.save(-1, 'sync')
+        self.assertEqual(len(self.failing_report(messages)), 1)
+        self.assertIn('price -1', self.failing_report(messages)[0])
+
+    def test_thread_within_latency_budget(self):
+        messages = self.save(-1, 'thread', latency_budget=10000)
+        self.assertEqual(len(self.failing_report(messages)), 1)
+        self.assertNotIn(TESTS_PENDING_MESSAGE, messages)
+        self.assertFalse(TestResult.objects.get(test_method__method_name='check_price').passed)
+
+    def test_thread_over_latency_budget(self):
+        started, release = threading.Event(), threading.Event()
+
+        @test_method('Price is positive')
+        def check_price(product):
+            started.set()
+            release.wait(10)
+            return product.price > 0
+
+        with mock.patch.object(Product, 'check_price', check_price):
+            messages = self.save(-1, 'thread', latency_budget=1)
+            self.assertIn(TESTS_PENDING_MESSAGE, messages)
+            self.assertEqual(self.failing_report(messages), [])
+            self.assertTrue(started.wait(10))
+            # Still running when the change page is shown again
+            self.assertIn(TESTS_PENDING_MESSAGE, self.view('thread'))
+            release.set()
+            self.shut_down_executor()
+        self.assertNotIn(TESTS_PENDING_MESSAGE, self.view('thread'))
+        self.assertFalse(TestResult.objects.get(test_method__method_name='check_price').passed)
+
+    def test_queue(self):
+        messages = self.save(-1, 'queue')
+        self.assertIn(TESTS_PENDING_MESSAGE, messages)
+        self.assertEqual(self.failing_report(messages), [])
+        self.assertTrue(DirtyObject.objects.filter(object_id=self.product.pk).exists())
+        self.assertIn(TESTS_PENDING_MESSAGE, self.view('queue'))
+
+        DirtyObject.drain()
+        self.assertNotIn(TESTS_PENDING_MESSAGE, self.view('queue'))
+        self.assertFalse(TestResult.objects.get(test_method__method_name='check_price').passed)
+
+
+class TestResultChangeListTests(AdminTestCase):
+
+    def changelist(self):
+        return self.client.get(reverse('admin:data_tests_testresult_changelist'))
+
+    def test_tested_objects_are_loaded_in_one_query(self):
+        Product.objects.create(name='a', price=1)
+        TestMethod.rerun_all_tests()
+        with CaptureQueriesContext(connection) as queries:
+            self.changelist()
+
+        # More results on the page, one of them for an object that has been deleted
+        products = [Product.objects.create(name='', price=-1) for _ in range(4)]
+        TestMethod.rerun_all_tests()
+        Product.objects.filter(pk=products[0].pk).delete()
+        with self.assertNumQueries(len(queries)):
+            response = self.changelist()
+        self.assertContains(response, 'Object no longer exists', count=3)
+        self.assertContains(response, str(products[1]))
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from unittest import mock
+
+from data_tests.models import TestMethod
+from data_tests.registry import test_batch_method
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class BatchTestMethodTests(SummaryTestCase):
+
+    def test_results_match_returned_mapping(self):
+        cheap = Product.objects.create(name='a', price=1)
+        expensive = Product.objects.create(name='a', price=5000)
+        report = self.check_price_batch.run_test_method()
+        self.assertEqual(report.newly_failing, [expensive.pk])
+        self.assertTrue(self.result(self.check_price_batch, cheap).passed)
+        self.assertEqual(self.result(self.check_price_batch, expensive).message, 'too expensive')
+        self.assertSummariesMatchResults()
+
+    def test_non_mapping_fails_chunk(self):
+        products = [Product.objects.create(name='a', price=1) for _ in range(2)]
+
+        @classmethod
+        @test_batch_method('Price is below 1000')
+        def check_price_batch(cls, products):
+            return [product.pk for product in products]
+
+        with mock.patch.object(Product, 'check_price_batch', check_price_batch):
+            reports = {report.test_method_id: report for report in TestMethod.rerun_all_tests()}
+        report = reports[self.check_price_batch.pk]
+        self.assertIsNone(report.error)
+        self.assertEqual(report.failed, 2)
+        for product in products:
+            result = self.result(self.check_price_batch, product)
+            self.assertFalse(result.passed)
+            self.assertTrue(result.message.startswith('Test failed to run correctly! batch tests must return'))
+        self.assertSummariesMatchResults()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import csv
+from io import StringIO
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+
+from data_tests.export import COLUMNS
+from data_tests.models import TestMethod
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class ExportTestCase(SummaryTestCase):
+
+    def setUp(self):
+        super(ExportTestCase, self).setUp()
+        self.failing = [Product.objects.create(name='a', price=-price) for price in (1, 2)]
+        Product.objects.create(name='a', price=1)
+        TestMethod.rerun_all_tests()
+        self.xfail = self.result(self.check_price, self.failing[1])
+        self.xfail.xfail = True
+        self.xfail.save()
+
+    def export(self, *args, **options):
+        stdout = StringIO()
+        call_command('exportdatatestresults', *args, stdout=stdout, **options)
+        return stdout.getvalue()
+
+
+class ExportCommandTests(ExportTestCase):
+
+    def test_csv(self):
+        rows = list(csv.reader(StringIO(self.export())))
+        self.assertEqual(tuple(rows[0]), COLUMNS)
+        self.assertEqual([(row[2], row[4], row[6]) for row in rows[1:]],
+                         [('Price is positive', str(self.failing[0].pk), 'price -1')])
+
+    def test_include_xfail_and_test_filter(self):
+        rows = list(csv.reader(StringIO(self.export(include_xfail=True, test_method='check_price'))))
+        self.assertEqual([row[4] for row in rows[1:]], [str(product.pk) for product in self.failing])
+        self.assertEqual([row[5] for row in rows[1:]], ['False', 'True'])
+        self.assertEqual(len(list(csv.reader(StringIO(self.export(test_method='check_names'))))), 1)
+
+    def test_jsonl_with_objects(self):
+        lines = self.export(format='jsonl', with_objects=True, chunk_size=1).splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(set(row), set(COLUMNS) | {'object'})
+        self.assertEqual((row['object_id'], row['object'], row['xfail']),
+                         (self.failing[0].pk, str(self.failing[0]), False))
+
+    def test_with_objects_of_deleted_object(self):
+        Product.objects.filter(pk=self.failing[0].pk).delete()
+        rows = list(csv.DictReader(StringIO(self.export(with_objects=True))))
+        self.assertEqual([(row['object_id'], row['object']) for row in rows], [(str(self.failing[0].pk), '')])
+
+    def test_output_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'failing.csv')
+            self.assertEqual(self.export(output=path), '')
+            with open(path, newline='') as f:
+                self.assertEqual(f.read(), self.export())
+
+
+class ExportViewTests(ExportTestCase):
+
+    def setUp(self):
+        super(ExportViewTests, self).setUp()
+        self.url = reverse('data_tests:TestResult_export')
+        self.staff = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def get(self, **params):
+        self.client.force_login(self.staff)
+        return self.client.get(self.url, params)
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(User.objects.create_user('user', password='password'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(getattr(response, 'streaming', False))
+
+    def test_csv(self):
+        response = self.get()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('failing_test_results.csv', response['Content-Disposition'])
+        self.assertEqual(self.content(response), self.export())
+
+    def test_jsonl(self):
+        response = self.get(format='jsonl', include_xfail='true', with_objects='true',
+                            test_method=self.check_price.pk, content_type=self.check_price.content_type_id)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([(row['object_id'], row['xfail'], row['object']) for row in rows],
+                         [(product.pk, product.pk == self.xfail.object_id, str(product)) for product in self.failing])
+
+    def test_bad_parameters(self):
+        response = self.get(format='xml')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('format must be one of csv, jsonl', response.json()['error'])
+        self.assertEqual(self.get(test_method='x').status_code, 400)
+        self.assertEqual(self.get(include_xfail='maybe').status_code, 400)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from unittest import mock
+
+from data_tests.models import TestResult
+from data_tests.registry import test_class_method, test_method
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class FingerprintTests(SummaryTestCase):
+
+    def setUp(self):
+        super(FingerprintTests, self).setUp()
+        self.calls = []
+        self.raises = False
+        case = self
+
+        @test_method('Price is positive', inputs=('price',), version=1)
+        def check_price(self):
+            case.calls.append(self.pk)
+            if case.raises:
+                raise RuntimeError('flaky')
+            return self.price > 0
+
+        patcher = mock.patch.object(Product, 'check_price', check_price)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.products = [Product.objects.create(name='a', price=1) for _ in range(3)]
+
+    def test_unchanged_objects_are_skipped(self):
+        self.check_price.run_test_method()
+        self.calls = []
+        report = self.check_price.run_test_method()
+        self.assertEqual((report.skipped, report.tested), (3, 0))
+        self.assertEqual(self.calls, [])
+
+        Product.objects.filter(pk=self.products[0].pk).update(price=-1)
+        report = self.check_price.run_test_method()
+        self.assertEqual((report.skipped, report.tested), (2, 1))
+        self.assertEqual(report.newly_failing, [self.products[0].pk])
+        self.assertSummariesMatchResults()
+
+    def test_errors_are_retested(self):
+        self.raises = True
+        self.check_price.run_test_method()
+        self.assertFalse(self.result(self.check_price, self.products[0]).passed)
+        self.assertEqual(self.result(self.check_price, self.products[0]).fingerprint, '')
+
+        self.raises = False
+        report = self.check_price.run_test_method()
+        self.assertEqual((report.skipped, report.tested), (0, 3))
+        self.assertTrue(all(self.result(self.check_price, product).passed for product in self.products))
+        self.assertSummariesMatchResults()
+
+
+class ClassFingerprintTests(SummaryTestCase):
+
+    def setUp(self):
+        super(ClassFingerprintTests, self).setUp()
+        self.calls = 0
+        case = self
+
+        @test_class_method('Products have names', inputs=('name',), version=1)
+        def check_names(cls):
+            case.calls += 1
+            return cls.objects.filter(name=''), 'no name'
+
+        patcher = mock.patch.object(Product, 'check_names', classmethod(check_names))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.products = [Product.objects.create(name='a') for _ in range(3)]
+
+    def test_table_fingerprint_is_stored_on_the_test_method(self):
+        self.check_names.run_test_method()
+        self.check_names.refresh_from_db()
+        self.assertTrue(self.check_names.fingerprint)
+        self.assertFalse(TestResult.objects.filter(test_method=self.check_names).exclude(fingerprint='').exists())
+
+        report = self.check_names.run_test_method()
+        self.assertEqual((report.skipped, self.calls), (3, 1))
+
+        Product.objects.filter(pk=self.products[0].pk).update(name='')
+        # Only the result that flips is written, not every row of the test
+        report = self.check_names.run_test_method()
+        self.assertEqual((report.updated, report.newly_failing, self.calls), (1, [self.products[0].pk], 2))
+        self.assertSummariesMatchResults()
+
+    def test_new_objects_are_tested(self):
+        self.check_names.run_test_method()
+        product = Product.objects.create(name='')
+        self.check_names.run_test_method()
+        self.assertFalse(self.result(self.check_names, product).passed)
+        self.assertSummariesMatchResults()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from unittest import mock
+
+from data_tests.models import TestResult
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class NewResultTests(SummaryTestCase):
+
+    def setUp(self):
+        super(NewResultTests, self).setUp()
+        self.products = [Product.objects.create(name='a', price=price) for price in (1, -1, 2, -2, 3)]
+
+    def assertResultsCreated(self):
+        self.assertEqual(self.check_price.add_new_result_objects(chunk_size=2), 5)
+        results = TestResult.objects.filter(test_method=self.check_price)
+        self.assertEqual(sorted(results.values_list('object_id', flat=True)),
+                         [product.pk for product in self.products])
+        self.assertEqual(set(results.values_list('passed', 'message', 'xfail', 'justification', 'fingerprint')),
+                         {(False, '', False, '', '')})
+        self.assertSummariesMatchResults()
+
+        Product.objects.create(name='a', price=4)
+        self.assertEqual(self.check_price.add_new_result_objects(chunk_size=2), 1)
+        self.assertEqual(self.check_price.add_new_result_objects(chunk_size=2), 0)
+        self.assertSummariesMatchResults()
+
+    def test_anti_join_insert(self):
+        with mock.patch.object(self.check_price, '_merge_new_result_objects') as merge:
+            self.assertResultsCreated()
+        merge.assert_not_called()
+
+    def test_merge_fallback(self):
+        with mock.patch('data_tests.models.ANTI_JOIN_VENDORS', ()), \
+                mock.patch.object(self.check_price, '_insert_new_result_objects') as insert:
+            self.assertResultsCreated()
+            self.check_price.run_test_method(chunk_size=2)
+        insert.assert_not_called()
+        self.assertEqual([self.result(self.check_price, product).passed for product in self.products],
+                         [True, False, True, False, True])
+        self.assertSummariesMatchResults()
+
+    def test_merge_fallback_with_pk_range(self):
+        with mock.patch('data_tests.models.ANTI_JOIN_VENDORS', ()):
+            created = self.check_price.add_new_result_objects(pk_range=(self.products[1].pk, self.products[3].pk))
+        self.assertEqual(created, 2)
+        self.assertEqual(sorted(TestResult.objects.filter(test_method=self.check_price).values_list(
+            'object_id', flat=True)), [self.products[1].pk, self.products[2].pk])
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from io import StringIO
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from data_tests.models import TestMethod
+from data_tests.profiling import TestMethodProfile, profile_lines, write_profile_json
+from data_tests.reports import TestMethodReport
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class QueryCountTests(SummaryTestCase):
+
+    def test_queries_are_counted(self):
+        profile = TestMethodProfile()
+        with profile.capture():
+            list(Product.objects.all())
+            Product.objects.count()
+        self.assertEqual(profile.query_count, 2)
+        self.assertGreater(profile.wall_time, 0)
+        self.assertGreaterEqual(profile.wall_time, profile.query_time)
+
+        # Queries after the block aren't counted
+        Product.objects.count()
+        self.assertEqual(profile.query_count, 2)
+
+    def test_queries_are_counted_when_they_raise(self):
+        profile = TestMethodProfile()
+        execute = mock.Mock(side_effect=RuntimeError('boom'))
+        with self.assertRaises(RuntimeError):
+            profile(execute, 'SELECT 1', None, False, {})
+        self.assertEqual(profile.query_count, 1)
+
+    def test_profiled_run(self):
+        for price in (1, -1, 2):
+            Product.objects.create(name='a', price=price)
+        report = self.check_price.run_test_method(profile=True, chunk_size=2)
+        profile = report.profile.as_dict()
+        self.assertEqual(profile['objects_timed'], 3)
+        self.assertEqual(len(profile['slowest_objects']), 3)
+        self.assertGreater(profile['query_count'], 0)
+        self.assertIsNotNone(profile['p99'])
+        self.assertIsNone(self.check_price.run_test_method().profile)
+
+    def test_sharded_profiles_are_merged(self):
+        for price in (1, -1, 2, 3):
+            Product.objects.create(name='a', price=price)
+        report, = TestMethod.run_test_methods([self.check_price], shards=2, profile=True)
+        profile = report.profile.as_dict()
+        self.assertEqual(profile['objects_timed'], 4)
+        self.assertEqual(len(profile['slowest_objects']), 4)
+
+    def test_command_writes_profile(self):
+        Product.objects.create(name='a', price=1)
+        stdout = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.json')
+            call_command('rundatatests', profile_output=path, stdout=stdout)
+            with open(path) as f:
+                profiles = json.load(f)
+        self.assertEqual({profile['test_method_id'] for profile in profiles},
+                         {self.check_price.pk, self.check_names.pk, self.check_price_batch.pk})
+        self.assertIn('Queries', stdout.getvalue())
+
+
+class ProfileMergeTests(SimpleTestCase):
+
+    def profile(self, wall_time, object_times):
+        profile = TestMethodProfile()
+        profile.wall_time = wall_time
+        profile.query_count = len(object_times)
+        profile.query_time = wall_time / 2
+        for object_id, seconds in object_times:
+            profile.record_object(object_id, seconds)
+        return profile
+
+    def test_merge(self):
+        with mock.patch('data_tests.profiling.PROFILE_SLOWEST_OBJECTS', 3):
+            merged = self.profile(1.0, [(1, 0.1), (2, 0.5)])
+            merged.merge(self.profile(2.0, [(3, 0.3), (4, 0.9), (5, 0.05)]))
+        profile = merged.as_dict()
+        self.assertEqual((profile['wall_time'], profile['query_count'], profile['query_time']), (3.0, 5, 1.5))
+        self.assertEqual(profile['objects_timed'], 5)
+        self.assertEqual([slow['object_id'] for slow in profile['slowest_objects']], [4, 2, 3])
+        self.assertEqual((profile['p50'], profile['p99']), (0.3, 0.9))
+
+    def test_merge_reports(self):
+        first, second = TestMethodReport(TestMethod(pk=1)), TestMethodReport(TestMethod(pk=1))
+        second.profile = self.profile(1.0, [(1, 0.1)])
+        merged, = TestMethodReport.merge_all([first, second])
+        self.assertIs(merged.profile, second.profile)
+
+    def test_empty_profile(self):
+        profile = TestMethodProfile().as_dict()
+        self.assertEqual((profile['objects_timed'], profile['p50'], profile['slowest_objects']), (0, None, []))
+
+    def test_write_profile_json(self):
+        reports = [TestMethodReport(TestMethod(pk=pk, title='Test {}'.format(pk))) for pk in (1, 2, 3)]
+        reports[0].profile = self.profile(1.0, [(1, 0.1)])
+        reports[1].profile = self.profile(2.0, [])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.json')
+            write_profile_json(reports, path)
+            with open(path) as f:
+                profiles = json.load(f)
+        # Slowest first, and only the reports that were profiled
+        self.assertEqual([(profile['test_method_id'], profile['title']) for profile in profiles],
+                         [(2, 'Test 2'), (1, 'Test 1')])
+        self.assertEqual(profiles[1]['slowest_objects'], [{'object_id': 1, 'seconds': 0.1}])
+        self.assertEqual(len(profile_lines(reports)), 3)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from io import StringIO
+
+from django.core.management import call_command
+
+from data_tests.models import TestMethod, TestResult
+from data_tests.pruning import prune
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class PruneTests(SummaryTestCase):
+
+    def setUp(self):
+        super(PruneTests, self).setUp()
+        self.products = [Product.objects.create(name='a', price=1) for _ in range(4)]
+        TestMethod.rerun_all_tests()
+        self.removed = TestMethod.objects.create(content_type_id=self.check_price.content_type_id,
+                                                 method_name='check_removed', title='Removed', is_class_method=False)
+        TestResult.objects.bulk_create([
+            TestResult(test_method=self.removed, content_type_id=self.removed.content_type_id, object_id=product.pk)
+            for product in self.products])
+        Product.objects.filter(pk__in=[self.products[0].pk, self.products[1].pk]).delete()
+
+    def test_dry_run_counts_match_prune(self):
+        # 4 results of the removed test method, and 2 results of each of the 3 other tests for deleted objects
+        self.assertEqual(prune(dry_run=True), (1, 10))
+        self.assertEqual(TestResult.objects.count(), 16)
+        self.assertEqual(prune(chunk_size=3), (1, 10))
+        self.assertFalse(TestMethod.objects.filter(pk=self.removed.pk).exists())
+        self.assertEqual(TestResult.objects.count(), 6)
+        self.assertSummariesMatchResults()
+        self.assertEqual(prune(), (0, 0))
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('prunedatatests', dry_run=True, stdout=stdout)
+        self.assertIn('Would delete 1 test methods and 10 test results', stdout.getvalue())
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from data_tests.deferred import has_pending_tests
+from data_tests.models import DirtyObject, TestMethod
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class DirtyObjectQueueTests(SummaryTestCase):
+
+    def setUp(self):
+        super(DirtyObjectQueueTests, self).setUp()
+        self.products = [Product.objects.create(name='a', price=1) for _ in range(3)]
+        self.content_type_id = self.check_price.content_type_id
+        DirtyObject.enqueue(self.content_type_id, [product.pk for product in self.products])
+
+    def test_enqueue_is_deduplicated(self):
+        DirtyObject.enqueue(self.content_type_id, [self.products[0].pk])
+        self.assertEqual(DirtyObject.objects.count(), 3)
+
+    def test_claims_are_not_shared(self):
+        claim = DirtyObject.claim_batch(chunk_size=2)
+        self.assertEqual(DirtyObject.objects.filter(claim=claim).count(), 2)
+        other = DirtyObject.claim_batch(chunk_size=2)
+        self.assertNotEqual(claim, other)
+        self.assertEqual(DirtyObject.objects.filter(claim=other).count(), 1)
+        self.assertIsNone(DirtyObject.claim_batch())
+
+    def test_requeued_while_claimed(self):
+        claim = DirtyObject.claim_batch()
+        DirtyObject.enqueue(self.content_type_id, [self.products[0].pk])
+        self.assertEqual(DirtyObject.objects.filter(claim=0).count(), 1)
+        self.assertNotEqual(DirtyObject.claim_batch(), claim)
+
+    def test_drain_tests_objects_and_empties_queue(self):
+        Product.objects.filter(pk=self.products[0].pk).update(price=-1)
+        reports = DirtyObject.drain()
+        self.assertFalse(DirtyObject.objects.exists())
+        report = next(report for report in reports if report.test_method_id == self.check_price.pk)
+        self.assertEqual(report.failed, 1)
+        self.assertFalse(has_pending_tests(self.products[0], 'queue'))
+        self.assertSummariesMatchResults()
+
+    def test_failed_drain_releases_claim(self):
+        with mock.patch.object(TestMethod, 'rerun_tests_for_object_ids', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                DirtyObject.drain()
+        self.assertEqual(DirtyObject.objects.filter(claim=0).count(), 3)
+        DirtyObject.drain()
+        self.assertFalse(DirtyObject.objects.exists())
+
+    def test_release_drops_rows_queued_again(self):
+        claim = DirtyObject.claim_batch()
+        DirtyObject.enqueue(self.content_type_id, [self.products[0].pk])
+        DirtyObject.release(claim)
+        self.assertEqual(DirtyObject.objects.filter(claim=0).count(), 3)
+
+    @override_settings(DATA_TESTS_CLAIM_TIMEOUT=60)
+    def test_expired_claims_are_claimed_again(self):
+        claim = DirtyObject.claim_batch()
+        self.assertIsNone(DirtyObject.claim_batch())
+        DirtyObject.objects.filter(claim=claim).update(claimed=timezone.now() - timedelta(seconds=61))
+        self.assertTrue(has_pending_tests(self.products[0], 'queue'))
+        DirtyObject.drain()
+        self.assertFalse(DirtyObject.objects.exists())
+        self.assertFalse(has_pending_tests(self.products[0], 'queue'))
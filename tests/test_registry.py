@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import SimpleTestCase
+
+from data_tests.models import TestMethod, TestResult
+from data_tests.registry import _test_methods_of, models_with_data_tests, sync_test_methods, test_method
+
+from tests.models import CheapProduct, Product
+from tests.test_summaries import SummaryTestCase
+
+
+class ProxyModelTests(SummaryTestCase):
+    """ Proxy models share the tests and results of their concrete model """
+
+    def test_no_test_methods_for_proxy(self):
+        self.assertNotIn(CheapProduct, models_with_data_tests())
+        self.assertFalse(sync_test_methods())
+        self.assertEqual(set(TestMethod.objects.values_list('content_type', flat=True)),
+                         {ContentType.objects.get_for_model(Product).pk})
+        self.assertEqual(TestMethod.objects.count(), 3)
+
+    def test_proxy_results_belong_to_concrete_model(self):
+        product = CheapProduct.objects.create(name='', price=-1)
+        TestResult.rerun_tests_for_object(product)
+        results = TestResult.test_results_for_object(Product.objects.get(pk=product.pk))
+        self.assertEqual(results.count(), 3)
+        self.assertEqual(TestResult.test_results_for_object(product).count(), 3)
+        TestMethod.rerun_all_tests()
+        self.assertEqual(TestResult.objects.count(), 3)
+        self.assertSummariesMatchResults()
+
+
+class OverriddenTestTests(SimpleTestCase):
+
+    def test_test_overridden_by_plain_method_is_dropped(self):
+        class Base(object):
+            @test_method('Check')
+            def check(self):
+                return True
+
+            @test_method('Other')
+            def other(self):
+                return True
+
+        class Child(Base):
+            def check(self):
+                return False
+
+        self.assertEqual(set(_test_methods_of(Base)), {'check', 'other'})
+        self.assertEqual(set(_test_methods_of(Child)), {'other'})
+
+    def test_test_overridden_by_test_is_kept(self):
+        class Base(object):
+            @test_method('Check')
+            def check(self):
+                return True
+
+        class Child(Base):
+            @test_method('Stricter check')
+            def check(self):
+                return False
+
+        self.assertEqual(_test_methods_of(Child)['check']['title'], 'Stricter check')
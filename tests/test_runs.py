@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from data_tests.models import TestMethod, TestRun
+from data_tests.registry import test_method
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class SerialRunErrorTests(SummaryTestCase):
+    """ A test method that raises is reported without stopping the rest of a run """
+
+    def crash(self, *args, **kwargs):
+        raise RuntimeError('boom')
+
+    def test_error_is_reported_and_other_tests_run(self):
+        Product.objects.create(name='', price=1)
+        with mock.patch.object(TestMethod, '_run_test_method_instance', self.crash), \
+                self.assertLogs('data_tests.models', 'ERROR'):
+            reports = {report.test_method_id: report for report in TestMethod.rerun_all_tests()}
+        self.assertIn('RuntimeError: boom', reports[self.check_price.pk].error)
+        self.assertIsNone(reports[self.check_names.pk].error)
+        self.assertEqual(reports[self.check_names.pk].failed, 1)
+        # The high-water mark for incremental runs only advances for test methods that succeeded
+        self.assertIsNone(TestMethod.objects.get(pk=self.check_price.pk).last_run)
+        self.assertIsNotNone(TestMethod.objects.get(pk=self.check_names.pk).last_run)
+
+    def test_command_finishes_test_run(self):
+        Product.objects.create(name='a', price=1)
+        stderr = StringIO()
+        with mock.patch.object(TestMethod, '_run_test_method_instance', self.crash), \
+                self.assertLogs('data_tests.models', 'ERROR'):
+            call_command('rundatatests', stdout=StringIO(), stderr=stderr)
+        self.assertIn('1 of 3 test methods could not be run', stderr.getvalue())
+        test_run = TestRun.objects.get()
+        self.assertIsNotNone(test_run.finished)
+        self.assertEqual(test_run.test_method_runs.exclude(error='').get().test_method_id, self.check_price.pk)
+
+
+class BudgetTests(SummaryTestCase):
+
+    @override_settings(DATA_TESTS_METHOD_BUDGET=1e-9)
+    def run_out_of_budget(self):
+        with self.assertLogs('data_tests.models', 'WARNING'):
+            return self.check_price.run_test_method(chunk_size=1)
+
+    def test_results_not_run_are_retried_incrementally(self):
+        products = [Product.objects.create(name='a', price=1) for _ in range(3)]
+        report = self.run_out_of_budget()
+        self.assertTrue(report.budget_exceeded)
+        self.assertEqual(report.not_run, 2)
+        self.assertSummariesMatchResults()
+        TestMethod.objects.filter(pk=self.check_price.pk).update(last_run=report.started)
+
+        self.check_price.refresh_from_db()
+        report = self.check_price.run_test_method(incremental=True)
+        self.assertEqual((report.tested, report.not_run), (2, 0))
+        self.assertTrue(all(self.result(self.check_price, product).passed for product in products))
+        self.assertSummariesMatchResults()
+
+
+class FetchHintTests(SummaryTestCase):
+
+    def test_hints_are_applied_to_objects_to_test(self):
+        @test_method('Price is positive', only=('price',))
+        def check_price(self):
+            return self.price > 0
+
+        with mock.patch.object(Product, 'check_price', check_price):
+            sql = str(self.check_price.objects_to_test(Product._base_manager.all()).query)
+            product = Product.objects.create(name='a', price=1)
+            self.check_price.run_test_method()
+        self.assertIn('"price"', sql)
+        self.assertNotIn('"name"', sql)
+        self.assertTrue(self.result(self.check_price, product).passed)
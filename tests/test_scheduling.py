@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from data_tests.constants import DEFAULT_OBJECT_COST
+from data_tests.models import TestMethodRun, TestRun
+from data_tests.scheduling import TaskEstimate, estimate_tasks, makespan, schedule
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class EstimateTests(SummaryTestCase):
+
+    def setUp(self):
+        super(EstimateTests, self).setUp()
+        for _ in range(100):
+            Product.objects.create(name='a')
+        self.test_run = TestRun.objects.create()
+
+    def add_run(self, test_method, seconds, objects_tested):
+        TestMethodRun.objects.create(test_run=self.test_run, test_method=test_method, started=timezone.now(),
+                                     duration=timedelta(seconds=seconds), objects_tested=objects_tested)
+
+    def test_cost_per_object_from_history(self):
+        # A full run, then incremental runs that tested few or no objects
+        self.add_run(self.check_price, 10, 100)
+        self.add_run(self.check_price, 1, 10)
+        self.add_run(self.check_price, 0.5, 0)
+        estimate, = estimate_tasks([(self.check_price, None)])
+        self.assertEqual((estimate.rows, estimate.source), (100, 'history'))
+        self.assertAlmostEqual(estimate.seconds, 10)
+
+    def test_default_cost_and_shards(self):
+        estimates = estimate_tasks([(self.check_price, (None, 50)), (self.check_price, (50, None))])
+        self.assertEqual([(estimate.rows, estimate.source) for estimate in estimates], [(50, 'default')] * 2)
+        self.assertAlmostEqual(estimates[0].seconds, 50 * DEFAULT_OBJECT_COST)
+
+    def test_plan(self):
+        self.add_run(self.check_price, 20, 100)
+        self.add_run(self.check_names, 2, 100)
+        stdout = StringIO()
+        call_command('rundatatests', plan=True, workers=2, stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        # Longest first
+        self.assertIn(str(self.check_price), lines[1])
+        self.assertIn('20.00  history', lines[1])
+        self.assertIn('Predicted run time with 2 worker(s): 20.00s', lines[-1])
+        self.assertFalse(TestRun.objects.exclude(pk=self.test_run.pk).exists())
+
+
+class MakespanTests(SimpleTestCase):
+
+    def estimates(self, *seconds):
+        return [TaskEstimate(None, None, task_seconds, 0, 'default') for task_seconds in seconds]
+
+    def test_makespan(self):
+        estimates = schedule(self.estimates(1, 4, 2, 3))
+        self.assertEqual([estimate.seconds for estimate in estimates], [4, 3, 2, 1])
+        self.assertEqual(makespan(estimates, 1), 10)
+        self.assertEqual(makespan(estimates, 2), 5)
+        self.assertEqual(makespan(estimates, 4), 4)
+        self.assertEqual(makespan([], 2), 0)
+        self.assertEqual(makespan(estimates, 0), 10)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from data_tests.models import TestMethod, TestMethodSummary, TestResult
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class ShardingTests(SummaryTestCase):
+
+    def setUp(self):
+        super(ShardingTests, self).setUp()
+        # Uneven pks, so that quantile and minmax boundaries differ
+        for pk, price in ((1, 1), (2, -1), (3, 1), (4, 5000), (10, -1), (20, 1), (30, 1), (100, -1)):
+            Product.objects.create(pk=pk, name='' if pk % 2 else 'a', price=price)
+
+    def state(self, reports):
+        results = sorted(TestResult.objects.values_list('test_method', 'object_id', 'passed', 'message'))
+        summaries = sorted(TestMethodSummary.objects.values_list('test_method', *TestMethodSummary.COUNTS))
+        reports = sorted((report.test_method_id, report.tested, report.updated, report.passed, report.failed,
+                          sorted(report.newly_failing), sorted(report.newly_passing)) for report in reports)
+        return results, summaries, reports
+
+    def assertShardedRunMatches(self, **options):
+        unsharded = self.state(TestMethod.run_test_methods(TestMethod.objects.all()))
+        TestResult.objects.all().delete()
+        TestMethodSummary.objects.all().delete()
+        sharded = self.state(TestMethod.run_test_methods(TestMethod.objects.all(), shards=3, **options))
+        self.assertEqual(sharded, unsharded)
+        self.assertSummariesMatchResults()
+
+    def test_quantile_shards(self):
+        self.assertShardedRunMatches()
+
+    def test_minmax_shards(self):
+        self.assertShardedRunMatches(shard_boundaries='minmax')
+
+    def test_pk_ranges(self):
+        self.assertEqual(self.check_price.pk_ranges(3), [(None, 3), (3, 20), (20, None)])
+        self.assertEqual(self.check_price.pk_ranges(3, 'minmax'), [(None, 34), (34, 67), (67, None)])
+        Product.objects.all().delete()
+        self.assertEqual(self.check_price.pk_ranges(3), [(None, None)])
+        self.assertEqual(self.check_price.pk_ranges(3, 'minmax'), [(None, None)])
+
+    def test_class_method_tests_are_not_sharded(self):
+        tasks = TestMethod.tasks_for(TestMethod.objects.all(), shards=3)
+        self.assertEqual([pk_range for test_method, pk_range in tasks if test_method == self.check_names], [None])
+        self.assertEqual(len([task for task in tasks if task[0] == self.check_price]), 3)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.test import TestCase
+
+from data_tests import resolver
+from data_tests.models import TestMethod, TestMethodSummary, TestResult
+from data_tests.registry import add_test_methods_to_database
+
+from tests.models import Product
+
+
+class SummaryTestCase(TestCase):
+    """ Base class for tests of data test runs, checking that TestMethodSummary always matches the results """
+
+    def setUp(self):
+        # Test callables are cached per process, and some tests patch them
+        resolver.clear_caches()
+        self.addCleanup(resolver.clear_caches)
+        add_test_methods_to_database()
+        self.check_price = TestMethod.objects.get(method_name='check_price')
+        self.check_names = TestMethod.objects.get(method_name='check_names')
+        self.check_price_batch = TestMethod.objects.get(method_name='check_price_batch')
+
+    def assertSummariesMatchResults(self):
+        counted = TestMethodSummary.counts_of(TestResult.objects.all())
+        for summary in TestMethodSummary.objects.all():
+            self.assertEqual({name: getattr(summary, name) for name in TestMethodSummary.COUNTS},
+                             counted.get(summary.test_method_id, dict.fromkeys(TestMethodSummary.COUNTS, 0)),
+                             str(summary.test_method))
+
+    def result(self, test_method, obj):
+        return TestResult.objects.get(test_method=test_method, object_id=obj.pk)
+
+
+class TestMethodSummaryTests(SummaryTestCase):
+
+    def test_run_updates_summary(self):
+        Product.objects.create(name='a', price=1)
+        Product.objects.create(name='', price=-1)
+        TestMethod.rerun_all_tests()
+        summary = TestMethodSummary.objects.get(test_method=self.check_price)
+        self.assertEqual((summary.passed, summary.failed), (1, 1))
+        self.assertSummariesMatchResults()
+
+    def test_rerun_after_changes(self):
+        products = [Product.objects.create(name='a', price=price) for price in (1, 2, 3)]
+        TestMethod.rerun_all_tests()
+        Product.objects.filter(pk=products[0].pk).update(price=-5, name='')
+        Product.objects.filter(pk=products[1].pk).update(price=5000)
+        TestMethod.rerun_all_tests()
+        self.assertSummariesMatchResults()
+        self.assertEqual(TestMethodSummary.objects.get(test_method=self.check_names).failed, 1)
+
+    def test_incremental_and_object_runs(self):
+        product = Product.objects.create(name='a', price=1)
+        TestMethod.rerun_all_tests()
+        product.price = -1
+        product.save()
+        TestMethod.rerun_all_tests(incremental=True)
+        self.assertSummariesMatchResults()
+        product.price = 2
+        product.save()
+        TestResult.rerun_tests_for_object(product)
+        self.assertSummariesMatchResults()
+        self.assertTrue(self.result(self.check_price, product).passed)
+
+    def test_xfail_edit_and_deleted_objects(self):
+        products = [Product.objects.create(name='', price=-1) for _ in range(3)]
+        TestMethod.rerun_all_tests()
+        result = self.result(self.check_price, products[0])
+        result.xfail = True
+        result.save()
+        self.assertEqual(TestMethodSummary.objects.get(test_method=self.check_price).xfail, 1)
+        self.assertSummariesMatchResults()
+
+        deleted_pk = products[1].pk
+        products[1].delete()
+        TestMethod.rerun_tests_for_object_ids(self.check_price.content_type_id, [deleted_pk])
+        self.assertFalse(TestResult.objects.filter(object_id=deleted_pk).exists())
+        self.assertSummariesMatchResults()
+
+    def test_conflicting_inserts_are_not_counted(self):
+        products = [Product.objects.create(name='a', price=1) for _ in range(2)]
+        TestMethod.rerun_all_tests()
+        TestResult.objects.filter(test_method=self.check_price, object_id=products[0].pk).delete()
+        TestMethodSummary.rebuild()
+        # The result of products[1] already exists, as if another process had just created it
+        inserted = TestResult.insert_new([
+            TestResult(test_method=self.check_price, content_type_id=self.check_price.content_type_id,
+                       object_id=product.pk) for product in products])
+        self.assertEqual(inserted, 1)
+        self.assertEqual(TestResult.objects.filter(test_method=self.check_price).count(), 2)
+        self.assertSummariesMatchResults()
+
+    def test_rebuild_repairs_summaries(self):
+        Product.objects.create(name='a', price=1)
+        TestMethod.rerun_all_tests()
+        TestMethodSummary.objects.update(passed=100)
+        repaired = TestMethodSummary.rebuild()
+        self.assertTrue(repaired)
+        self.assertSummariesMatchResults()
+        self.assertEqual(TestMethodSummary.rebuild(), [])
+
+
+class ClassMethodWriteTests(SummaryTestCase):
+    """ The CASE UPDATE writing class method test results only touches results whose value changes """
+
+    def test_only_changed_results_are_updated(self):
+        named = [Product.objects.create(name='a') for _ in range(3)]
+        unnamed = Product.objects.create(name='')
+        report = self.check_names.run_test_method()
+        self.assertEqual(report.updated, 4)
+        self.assertEqual(report.newly_failing, [unnamed.pk])
+
+        report = self.check_names.run_test_method()
+        self.assertEqual(report.updated, 0)
+        self.assertFalse(report.has_changes)
+
+        Product.objects.filter(pk=named[0].pk).update(name='')
+        report = self.check_names.run_test_method()
+        self.assertEqual(report.updated, 1)
+        self.assertEqual(report.newly_failing, [named[0].pk])
+        result = self.result(self.check_names, named[0])
+        self.assertEqual((result.passed, result.message), (False, 'no name'))
+        self.assertSummariesMatchResults()
+
+    def test_not_run_results_are_rewritten(self):
+        product = Product.objects.create(name='a')
+        self.check_names.run_test_method()
+        TestResult.objects.filter(test_method=self.check_names).update(passed=None, message='not run')
+        TestMethodSummary.rebuild()
+        report = self.check_names.run_test_method()
+        self.assertEqual(report.updated, 1)
+        self.assertTrue(self.result(self.check_names, product).passed)
+        self.assertSummariesMatchResults()
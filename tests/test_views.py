@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import warnings
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from django.urls import reverse
+
+from data_tests.models import TestMethod
+from data_tests.views import TestResultListView
+
+from tests.models import Product
+from tests.test_summaries import SummaryTestCase
+
+
+class TestResultViewTests(SummaryTestCase):
+
+    def setUp(self):
+        super(TestResultViewTests, self).setUp()
+        for price in (1, -1, 2, -2):
+            Product.objects.create(name='a', price=price)
+        TestMethod.rerun_all_tests()
+        self.staff = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def test_list_is_ordered(self):
+        # The response is left unrendered, as the app ships no list template
+        request = RequestFactory().get(reverse('data_tests:TestResult_list'))
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            response = TestResultListView.as_view()(request)
+            pks = [result.pk for result in response.context_data['object_list']]
+        self.assertEqual(pks, sorted(pks))
+
+    def test_api_requires_staff(self):
+        response = self.client.get(reverse('data_tests:TestResult_api'))
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('results', response.content.decode())
+
+    def test_api_pages(self):
+        self.client.force_login(self.staff)
+        url = reverse('data_tests:TestResult_api')
+        response = self.client.get(url, {'test_method': self.check_price.pk, 'passed': 'false', 'limit': 1})
+        page = response.json()
+        self.assertEqual(len(page['results']), 1)
+        self.assertIsNotNone(page['next'])
+        second = self.client.get(page['next']).json()
+        self.assertEqual(len(second['results']), 1)
+        self.assertGreater(second['results'][0]['id'], page['results'][0]['id'])
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.client.get(url, {'limit': 0}).status_code, 400)